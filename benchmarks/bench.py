@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measures the throughput and peak memory of the client against the local stand-in RDS server
+in tests/mock_server.py, so results are reproducible offline and comparable across versions.
+
+Run from the repository root:
+
+    python benchmarks/bench.py --rows 100000 --cols 10 --output before.json
+    python benchmarks/bench.py --rows 100000 --cols 10 --compare before.json
+
+Only the public API is used, and cases needing a feature the installed version lacks are
+skipped, so older versions can be measured for comparison.
+"""
+
+import argparse
+import gc
+import inspect
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+sys.path.insert(0, os.path.join(_ROOT, "tests"))
+
+import rds
+
+from rds import Server
+from mock_server import MockRdsServer
+
+try:
+    from rds.stream import read_page
+except ImportError:
+    # versions that decode pages with json.load straight from the response
+    read_page = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def bench_select(dataproduct, mock):
+    return len(dataproduct.select().records)
+
+
+def bench_select_parallel(dataproduct, mock):
+    return len(dataproduct.select(max_workers=4).records)
+
+
+def bench_iter_select(dataproduct, mock):
+    return sum(1 for _ in dataproduct.iter_select())
+
+
+def bench_select_columns(dataproduct, mock):
+    results = dataproduct.select(as_columns=True)
+    return len(next(iter(results.arrays.values()))) if results.arrays else 0
+
+
+def bench_select_compact(dataproduct, mock):
+    return len(dataproduct.select(compact=True).records)
+
+
+def bench_assemble(dataproduct, mock):
+    # every page collected into results, then converted into typed column arrays
+    arrays = dataproduct.select().to_columns()
+    return len(next(iter(arrays.values()))) if arrays else 0
+
+
+def bench_tabulate(dataproduct, mock):
+    dataproduct.tabulate(dims=["sex"], totals=True)
+    return mock.rows
+
+
+def bench_parse(dataproduct, mock):
+    return len(read_page(io.BytesIO(_page_body(mock)))["records"])
+
+
+def bench_parse_json(dataproduct, mock):
+    body = _page_body(mock)
+    return len(json.loads(body.decode("utf-8"))["records"])
+
+
+def _always(dataproduct):
+    return True
+
+
+def _select_accepts(parameter):
+    # whether the installed version's select has the parameter a case needs
+    def check(dataproduct):
+        return parameter in inspect.signature(dataproduct.select).parameters
+
+    return check
+
+
+def _has_method(name):
+    def check(dataproduct):
+        return hasattr(dataproduct, name)
+
+    return check
+
+
+def _can_assemble(dataproduct):
+    results = getattr(rds.dataproduct, "RdsResults", None)
+    return numpy is not None and hasattr(results, "to_columns")
+
+
+def _can_parse(dataproduct):
+    return read_page is not None
+
+
+# each case with the check telling whether the installed version supports it
+BENCHMARKS = {
+    "select": (bench_select, _always),
+    "select_parallel": (bench_select_parallel, _select_accepts("max_workers")),
+    "iter_select": (bench_iter_select, _has_method("iter_select")),
+    "select_columns": (bench_select_columns, _select_accepts("as_columns")),
+    "select_compact": (bench_select_compact, _select_accepts("compact")),
+    "assemble": (bench_assemble, _can_assemble),
+    "tabulate": (bench_tabulate, _always),
+    "parse": (bench_parse, _can_parse),
+    "parse_json": (bench_parse_json, _always),
+}
+
+_bodies = {}
+
+
+def _page_body(mock):
+    # a single full page body, built outside the measured code on first use
+    key = (mock.rows, mock.cols)
+    if key not in _bodies:
+        limit = mock.max_cells // mock.cols
+        _bodies[key] = json.dumps(
+            {
+                "info": {"moreRows": True},
+                "variables": mock.variables,
+                "records": mock.records[:limit],
+                "totals": [],
+            }
+        ).encode("utf-8")
+    return _bodies[key]
+
+
+def measure(name, function, dataproduct, mock, repeat):
+    """Runs a benchmark ``repeat`` times and returns its timings and peak memory."""
+    # the first run warms up connections, metadata and caches
+    function(dataproduct, mock)
+    times = []
+    rows = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        rows = function(dataproduct, mock)
+        times.append(time.perf_counter() - start)
+
+    # tracing slows allocations down, so memory is measured on a separate run
+    gc.collect()
+    tracemalloc.start()
+    function(dataproduct, mock)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        "name": name,
+        "rows": rows,
+        "median": median,
+        "min": min(times),
+        "rows_per_second": rows / median if median else None,
+        "peak_memory": peak,
+    }
+
+
+def run(args):
+    results = []
+    skipped = []
+    with MockRdsServer(
+        rows=args.rows, cols=args.cols, latency=args.latency, compress=not args.no_gzip
+    ) as mock:
+        dataproduct = Server(mock.url).get_catalog("test").get_dataproduct("synthetic")
+        for name in args.benchmarks or list(BENCHMARKS):
+            function, supported = BENCHMARKS[name]
+            if not supported(dataproduct):
+                skipped.append(name)
+                continue
+            results.append(measure(name, function, dataproduct, mock, args.repeat))
+
+    return {
+        "version": _version(),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": args.rows,
+        "cols": args.cols,
+        "latency": args.latency,
+        "gzip": not args.no_gzip,
+        "repeat": args.repeat,
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def report(run_results, baseline=None):
+    previous = {}
+    if baseline is not None:
+        previous = {result["name"]: result for result in baseline["results"]}
+
+    print(
+        "%d rows, %d columns, %.3fs latency, version %s (%s)"
+        % (
+            run_results["rows"],
+            run_results["cols"],
+            run_results["latency"],
+            run_results["version"],
+            run_results["commit"] or "unknown commit",
+        )
+    )
+    header = "%-16s %10s %14s %12s" % ("benchmark", "median s", "rows/s", "peak MiB")
+    if previous:
+        header += " %10s" % "vs base"
+    print(header)
+    for result in run_results["results"]:
+        line = "%-16s %10.4f %14.0f %12.2f" % (
+            result["name"],
+            result["median"],
+            result["rows_per_second"] or 0,
+            result["peak_memory"] / 1024.0 / 1024.0,
+        )
+        if result["name"] in previous:
+            line += " %9.2fx" % (previous[result["name"]]["median"] / result["median"])
+        print(line)
+    for name in run_results.get("skipped", []):
+        print("%-16s %10s" % (name, "skipped, not supported by this version"))
+
+
+def _version():
+    # the version being measured is the one in setup.py, rds.__version__ lags behind it
+    try:
+        with open(os.path.join(_ROOT, "setup.py")) as f:
+            match = re.search(r"version\s*=\s*['\"]([^'\"]+)['\"]", f.read())
+    except (IOError, OSError):
+        match = None
+    return match.group(1) if match else rds.__version__
+
+
+def _commit():
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=_ROOT,
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode("ascii").strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, default=20000, help="records in the product"
+    )
+    parser.add_argument("--cols", type=int, default=8, help="columns in the product")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every request"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="measured runs per case")
+    parser.add_argument(
+        "--no-gzip", action="store_true", help="serve uncompressed responses"
+    )
+    parser.add_argument(
+        "--benchmark",
+        dest="benchmarks",
+        action="append",
+        choices=sorted(BENCHMARKS),
+        help="only run this benchmark, may be repeated",
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with results saved by --output")
+    args = parser.parse_args(argv)
+
+    run_results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report(run_results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run_results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,16 @@
 from .server import Server
 from .catalog import Catalog
 from .dataproduct import DataProduct
+from .transport import Transport
+from .retry import RateLimiter, RetryPolicy
+from .paging import PageSizer
+from .codes import CodeIndex
+from .records import ChainedRecords, CompactRecords
+from .spill import SpilledRecords, SpillStore
+from .stats import QueryStats, RequestStats, StatsCollector
+from .exceptions import RdsConnectionError, RdsError, RdsHTTPError
+from .cache import MetadataCache, ResultCache
+from .aio import AsyncServer, AsyncCatalog, AsyncDataProduct, AsyncTransport
 
 __version__ = "0.2.0"
 __author__ = "Metadata Technology North America Inc."
@@ -12,4 +22,29 @@ __status__ = "Development"
 __license__ = "Apache-2.0"
 __copyright__ = "Copyright 2020, Metadata Technology North America Inc."
 
-__all__ = ["Server", "Catalog", "DataProduct"]
+__all__ = [
+    "Server",
+    "Catalog",
+    "DataProduct",
+    "Transport",
+    "RetryPolicy",
+    "RateLimiter",
+    "PageSizer",
+    "CodeIndex",
+    "ChainedRecords",
+    "CompactRecords",
+    "SpillStore",
+    "SpilledRecords",
+    "StatsCollector",
+    "RequestStats",
+    "QueryStats",
+    "RdsError",
+    "RdsHTTPError",
+    "RdsConnectionError",
+    "ResultCache",
+    "MetadataCache",
+    "AsyncServer",
+    "AsyncCatalog",
+    "AsyncDataProduct",
+    "AsyncTransport",
+]
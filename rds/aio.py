@@ -0,0 +1,840 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asyncio mirror of the Server, Catalog and DataProduct classes
+"""
+
+import asyncio
+import json
+import socket
+import ssl
+import time
+import zlib
+
+from urllib.parse import urljoin, urlsplit
+
+from .codes import CodeIndex
+from .dataproduct import (
+    DataProduct,
+    _count_columns,
+    _encode,
+    _get_metadata,
+    _get_rds_results,
+    _map_codes,
+    _variable_list,
+)
+from .exceptions import RdsConnectionError, RdsError, RdsHTTPError
+from .paging import PageSizer
+from .retry import RetryPolicy, parse_retry_after
+from .transport import _get_proxy
+
+_MAX_REDIRECTS = 5
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class AsyncTransport:
+    """
+    Makes non-blocking GET requests over keep-alive connections pooled per host, through the
+    proxies set in the environment like Transport.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        The number of requests allowed in flight at once. The default is 10.
+    pool_size : int, optional
+        The number of idle connections kept open per host. The default is 10.
+    timeout : float, optional
+        Seconds to wait for a whole request. The default is None which waits indefinitely.
+    compress : bool, optional
+        flag for asking the server for gzip/deflate encoded responses. The default is True.
+    retry : RetryPolicy, optional
+        When and how long to wait before retrying failed requests. The default is None which
+        uses a RetryPolicy with its defaults.
+    rate_limiter : RateLimiter, optional
+        Limits how many requests are sent per second, and can be shared with other
+        transports. The default is None.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=10,
+        pool_size=10,
+        timeout=None,
+        compress=True,
+        retry=None,
+        rate_limiter=None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.compress = compress
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self._loop = None
+        self._semaphore = None
+        self._pools = {}
+
+    async def open(self, url, headers=None):
+        """
+        Sends a GET request, following redirects.
+
+        Parameters
+        ----------
+        url : str
+            The full url to request.
+        headers : dict, optional
+            Additional request headers. The default is None.
+
+        Returns
+        -------
+        AsyncResponse
+            The status, headers and decoded body of the response.
+
+        Raises
+        ------
+        RdsConnectionError
+            If the connection failed, timed out or was dropped.
+        """
+        self._bind_loop()
+        async with self._semaphore:
+            for _ in range(_MAX_REDIRECTS + 1):
+                if self.rate_limiter is not None:
+                    await asyncio.sleep(self.rate_limiter.reserve())
+                try:
+                    if self.timeout is None:
+                        response = await self._open(url, headers)
+                    else:
+                        response = await asyncio.wait_for(
+                            self._open(url, headers), self.timeout
+                        )
+                except (
+                    OSError,
+                    ValueError,
+                    zlib.error,
+                    asyncio.IncompleteReadError,
+                    asyncio.TimeoutError,
+                ) as e:
+                    raise RdsConnectionError(
+                        "Error requesting [" + url + "]: " + str(e), url
+                    )
+                location = response.headers.get("location")
+                if response.status not in _REDIRECT_CODES or location is None:
+                    return response
+                url = urljoin(url, location)
+        raise RdsConnectionError("Too many redirects requesting [" + url + "].", url)
+
+    async def close(self):
+        """Closes every idle connection held by the transport."""
+        pools, self._pools = self._pools, {}
+        for connections in pools.values():
+            for _, writer in connections:
+                writer.close()
+
+    def _bind_loop(self):
+        # connections and semaphores belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._pools = {}
+
+    async def _open(self, url, headers):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        proxy = _get_proxy(parts.scheme, parts.netloc)
+        if proxy is not None and parts.scheme == "http":
+            target = url
+        else:
+            target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        lines = ["GET " + target + " HTTP/1.1", "Host: " + parts.netloc]
+        if self.compress:
+            lines.append("Accept-Encoding: gzip, deflate")
+        for name, value in (headers or {}).items():
+            lines.append(name + ": " + value)
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        connection = None
+        idle = self._pools.get(key)
+        if idle:
+            connection = idle.pop()
+            try:
+                response = await _exchange(connection, request, url)
+            except (OSError, asyncio.IncompleteReadError):
+                # the server may have dropped an idle keep-alive connection
+                connection = None
+        if connection is None:
+            connection = await self._connect(key, proxy)
+            response = await _exchange(connection, request, url)
+
+        idle = self._pools.setdefault(key, [])
+        if response._keep_alive and len(idle) < self.pool_size:
+            idle.append(connection)
+        else:
+            connection[1].close()
+        return response
+
+    async def _connect(self, key, proxy):
+        scheme, host, port = key
+        port = port or (443 if scheme == "https" else 80)
+        if proxy is None:
+            if scheme == "https":
+                return await asyncio.open_connection(
+                    host, port, ssl=ssl.create_default_context()
+                )
+            return await asyncio.open_connection(host, port)
+
+        proxy = urlsplit("//" + proxy)
+        if scheme != "https":
+            return await asyncio.open_connection(proxy.hostname, proxy.port or 80)
+        sock = await _open_tunnel(proxy.hostname, proxy.port or 80, host, port)
+        return await asyncio.open_connection(
+            sock=sock, ssl=ssl.create_default_context(), server_hostname=host
+        )
+
+
+class AsyncResponse:
+    """The status, headers and decoded body of a response."""
+
+    def __init__(self, url, status, reason, headers, body, keep_alive):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self._keep_alive = keep_alive
+
+    def getcode(self):
+        return self.status
+
+    def json(self):
+        return json.loads(self.body.decode("utf-8"))
+
+
+class AsyncServer:
+    """
+    Holds information to connect to a server hosting Rich Data Services (RDS) from asyncio code.
+
+    Parameters
+    ----------
+    domain : str, required
+        The RDS server domain name
+    protocol: str, optional
+        The network protocol, defaults to https
+    path: str, optional
+        The RDS path, defaults to /rds
+    port: str, optional
+        The port, defaults to None
+    api_key: str, optional
+        The API key sent with every request, defaults to None
+    transport: AsyncTransport, optional
+        The non-blocking HTTP transport shared by every catalog and data product of this
+        server, defaults to a new AsyncTransport
+    """
+
+    def __init__(
+        self,
+        domain,
+        protocol="https",
+        path="/rds",
+        port=None,
+        api_key=None,
+        transport=None,
+    ):
+        api = domain
+        if "http" not in domain:
+            api = protocol + "://" + api
+        port = "" if port == None else (":" + port)
+        if port not in domain:
+            api += port
+        if path not in domain:
+            api += path
+
+        self.api = api
+        self.api_key = api_key
+        self.transport = transport if transport is not None else AsyncTransport()
+
+    async def get_catalog(self, catalog_id, lazy=False):
+        """
+        Gets a catalog.
+
+        Parameters
+        ----------
+        catalog_id : string
+            ID of the catalog you want.
+        lazy : bool, optional
+            flag for skipping the metadata lookups of the catalog and its data products. Their
+            properties stay None until ``get_metadata`` is awaited. The default is False.
+
+        Returns
+        -------
+        AsyncCatalog
+            An object that contains data products and catalog properties.
+        """
+        metadata = None
+        if not lazy:
+            metadata = await _get_json(
+                self.api + "/api/catalog/" + catalog_id, self.api_key, self.transport
+            )
+        return AsyncCatalog(
+            self.api, self.api_key, catalog_id, metadata, self.transport, lazy=lazy
+        )
+
+    async def get_root_catalog(self):
+        """
+        Gets the root catalog that holds a list of all catalogs and data products along with their descriptive metadata.
+
+        Returns
+        -------
+        JSON
+            The root catalog.
+        """
+        return await _get_json(self.api + "/api/catalog", self.api_key, self.transport)
+
+    async def get_changelog(self):
+        """
+        Gets the changelog that describes all additions/removals/fixes listed on the date they were made.
+
+        Returns
+        -------
+        JSON
+            The changelog.
+        """
+        api_call = self.api + "/api/server/info"
+        return await _get_json(api_call, self.api_key, self.transport)
+
+    async def get_info(self):
+        """
+        Gets information about the server.
+
+        Returns
+        -------
+        JSON
+            Server information.
+        """
+        api_call = self.api + "/api/server/changelog"
+        return await _get_json(api_call, self.api_key, self.transport)
+
+
+class AsyncCatalog:
+    """
+    Holds information to connect to a catalog and allows access to its data products.
+
+    Created through ``AsyncServer.get_catalog``.
+    """
+
+    def __init__(self, api, api_key, catalog_id, metadata, transport, lazy=False):
+        self.api = api
+        self.api_key = api_key
+        self.catalog_id = catalog_id
+        self.transport = transport
+        self.lazy = lazy
+        self.name = None
+        self.description = None
+        self.uri = None
+        if metadata is not None:
+            self._set_metadata(metadata)
+
+    async def get_dataproduct(self, dataproduct_id, lazy=None):
+        """
+        Gets a dataproduct.
+
+        Parameters
+        ----------
+        dataproduct_id : string
+            ID of the dataproduct you want.
+        lazy : bool, optional
+            flag for skipping the data product's metadata lookup. The default is None which
+            follows the catalog.
+
+        Returns
+        -------
+        AsyncDataProduct
+            An object that can retrieve data and metadata from RDS.
+        """
+        metadata = None
+        if not (self.lazy if lazy is None else lazy):
+            api_call = (
+                self.api + "/api/catalog/" + self.catalog_id + "/" + dataproduct_id
+            )
+            metadata = await _get_json(api_call, self.api_key, self.transport)
+        return AsyncDataProduct(
+            self.api,
+            self.api_key,
+            self.catalog_id,
+            dataproduct_id,
+            metadata,
+            self.transport,
+        )
+
+    async def get_metadata(self):
+        """
+        Gets the metadata for the catalog in JSON format.
+
+        Returns
+        -------
+        metadata : JSON
+            Detailed information surrounding the catalog.
+        """
+        api_call = self.api + "/api/catalog/" + self.catalog_id
+        metadata = await _get_json(api_call, self.api_key, self.transport)
+        self._set_metadata(metadata)
+        return metadata
+
+    def _set_metadata(self, metadata):
+        self.name = metadata["name"]
+        self.description = (
+            metadata["description"] if "description" in metadata else None
+        )
+        self.uri = metadata["uri"]
+
+
+class AsyncDataProduct:
+    """
+    Holds information to connect to a data product and allows coroutines for querying it.
+
+    Created through ``AsyncCatalog.get_dataproduct``. The coroutines take the same parameters
+    as their ``DataProduct`` counterparts. When created lazily the name, description, last
+    update and uri stay None until ``get_metadata`` is awaited.
+    """
+
+    _get_url = DataProduct._get_url
+    _get_param = DataProduct._get_param
+    _select_query = DataProduct._select_query
+    _tabulate_query = DataProduct._tabulate_query
+
+    def __init__(self, api, api_key, catalog_id, dataproduct_id, metadata, transport):
+        self.api = api
+        self.api_key = api_key
+        self.catalog_id = catalog_id
+        self.dataproduct_id = dataproduct_id
+        self.transport = transport
+        self._column_count = None
+        self._code_indexes = {}
+        self.name = None
+        self.description = None
+        self.last_update = None
+        self.uri = None
+        if metadata is not None:
+            self._set_metadata(metadata)
+
+    async def count(self):
+        """Gets the count of records."""
+        api_call = self._get_url("query") + "/count"
+        return await _get_json(api_call, self.api_key, self.transport)
+
+    async def select(
+        self,
+        cols=None,
+        where=None,
+        orderby=None,
+        groupby=None,
+        collimit=None,
+        coloffset=0,
+        weights=None,
+        metadata=True,
+        inject=False,
+        count=False,
+        limit=None,
+        offset=0,
+        rds_format=None,
+        max_workers=None,
+        page_sizer=None,
+    ):
+        """
+        Queries the data product for a set of records. When ``max_workers`` is set, the pages
+        after the first are requested concurrently. A ``page_sizer`` sizes each page from the
+        previous ones.
+
+        Returns
+        -------
+        results : RdsResults
+            A wrapper object for the dataframe and metadata.
+        """
+        api_call, params = self._select_query(
+            cols,
+            where,
+            orderby,
+            groupby,
+            collimit,
+            coloffset,
+            weights,
+            metadata,
+            inject,
+            count,
+            rds_format,
+        )
+        sizer = page_sizer if page_sizer is not None else PageSizer()
+        max_records, limit = await self._page_limits(cols, collimit, limit, sizer)
+
+        if max_workers is not None and max_workers > 1:
+            results = await self._batch_parallel(
+                api_call, params, max_records, limit, offset, max_workers, sizer
+            )
+        else:
+            results = await self._batch(
+                api_call, params, max_records, limit, offset, sizer
+            )
+
+        metadata_json = None
+        if metadata:
+            metadata_json = _get_metadata(results)
+
+        count_value = None
+        if count:
+            count_value = results[0]["info"]["rowCount"]
+
+        if inject == "client":
+            await self._inject_labels(results)
+        return _get_rds_results(results, metadata_json, count_value)
+
+    async def tabulate(
+        self,
+        dims=None,
+        measure=None,
+        where=None,
+        orderby=None,
+        groupby=None,
+        weights=None,
+        totals=False,
+        metadata=True,
+        inject=False,
+        count=False,
+        rds_format=None,
+    ):
+        """
+        Queries the data product for a set of tabulated records.
+
+        Returns
+        -------
+        results : RdsResults
+            A wrapper object for the dataframe and metadata.
+        """
+        api_call, params = self._tabulate_query(
+            dims,
+            measure,
+            where,
+            orderby,
+            groupby,
+            weights,
+            totals,
+            metadata,
+            inject,
+            count,
+            rds_format,
+        )
+
+        results = [await self._query(api_call, params)]
+        if inject == "client":
+            await self._inject_labels(results)
+
+        metadata_json = None
+        if metadata:
+            metadata_json = _get_metadata(results)
+
+        count_value = None
+        if count:
+            count_value = results[0]["info"]["rowCount"]
+
+        return _get_rds_results(results, metadata_json, count_value)
+
+    async def get_variable(self, variable=None):
+        """Gets the metadata for one or more variables in JSON format."""
+        api_call = self._get_url("catalog")
+        if variable is None:
+            api_call += "/variables"
+        else:
+            api_call += "/variable/" + variable
+        return await _get_json(api_call, self.api_key, self.transport)
+
+    async def get_classification(self, classification=None):
+        """Gets the metadata for one or more classifications in JSON format."""
+        api_call = self._get_url("catalog")
+        if classification is None:
+            api_call += "/classifications"
+        else:
+            api_call += "/classification/" + classification
+        return await _get_json(api_call, self.api_key, self.transport)
+
+    async def get_code(self, classification, limit=20, offset=0):
+        """Gets the metadata for codes in JSON format."""
+        api_call = (
+            self._get_url("catalog") + "/classification/" + classification + "/codes?"
+        )
+        params = {}
+        params.update(self._get_param(limit, "limit"))
+        if offset:
+            params.update(self._get_param(offset, "offset"))
+        return await self._query(api_call, params)
+
+    async def get_codes(self, classification, page_size=1000):
+        """Gets the metadata for every code of a classification, one page at a time."""
+        classification_json = await self.get_classification(classification)
+        code_count = classification_json.get("codeCount")
+        codes = []
+        while code_count is None or len(codes) < code_count:
+            page = await self.get_code(classification, page_size, len(codes))
+            codes.extend(page)
+            if not page or (code_count is None and len(page) < page_size):
+                break
+        return codes
+
+    async def get_code_index(self, classification):
+        """Gets every code of a classification indexed by code value and by label."""
+        if classification not in self._code_indexes:
+            codes = await self.get_codes(classification)
+            self._code_indexes[classification] = CodeIndex(classification, codes)
+        return self._code_indexes[classification]
+
+    async def profile(self, variable):
+        """Gets a profile on a variable that contains statistical information."""
+        api_call = self._get_url("catalog") + "/variables/profile?cols=" + variable
+        return await _get_json(api_call, self.api_key, self.transport)
+
+    async def get_metadata(self):
+        """Gets the metadata for the dataproduct in JSON format."""
+        api_call = self._get_url("catalog")
+        metadata = await _get_json(api_call, self.api_key, self.transport)
+        self._set_metadata(metadata)
+        return metadata
+
+    def _set_metadata(self, metadata):
+        self.name = metadata["name"]
+        self.description = metadata["description"]
+        self.last_update = metadata["lastUpdate"]
+        self.uri = metadata["uri"]
+        if "variables" in metadata:
+            self._column_count = len(metadata["variables"])
+
+    async def _inject_labels(self, results):
+        # replaces the codes of coded columns with their labels, see DataProduct
+        if not results:
+            return
+        coded = []
+        for index, variable in enumerate(results[0].get("variables") or []):
+            classification = variable.get("classification")
+            if classification:
+                codes = await self.get_code_index(classification["id"])
+                coded.append((index, codes.labels))
+        for result in results:
+            for index, labels in coded:
+                _map_codes(result["records"], index, labels)
+                _map_codes(result.get("totals") or [], index, labels)
+
+    async def _query(self, api_call, params):
+        return await _get_json(_encode(api_call, params), self.api_key, self.transport)
+
+    async def _page_limits(self, cols, collimit, limit, sizer):
+        max_records = limit
+        ceiling = sizer.get_ceiling(await self._get_column_count(cols, collimit))
+        if limit == None or limit > ceiling:
+            limit = ceiling
+        return max_records, limit
+
+    async def _get_column_count(self, cols, collimit):
+        if cols == None:
+            if self._column_count is None:
+                variables = _variable_list(await self.get_variable())
+                self._column_count = len(variables)
+            col_count = self._column_count
+        else:
+            col_count = _count_columns(cols)
+
+        if collimit == None:
+            return col_count
+        else:
+            return col_count if col_count < collimit else collimit
+
+    async def _batch(self, api_call, params, max_records, limit, offset=0, sizer=None):
+        if sizer is None:
+            sizer = PageSizer()
+        results = []
+        params = dict(params)
+
+        first_pass = True
+        more_rows = True
+        while (first_pass or more_rows) and (max_records == None or max_records > 0):
+            first_pass = False
+            params.update(self._get_param(offset, "offset"))
+
+            if max_records == None:
+                params.update(self._get_param(limit, "limit"))
+                offset += limit
+            else:
+                if max_records > limit:
+                    params.update(self._get_param(limit, "limit"))
+                    offset += limit
+                    max_records -= limit
+                else:
+                    params.update(self._get_param(max_records, "limit"))
+                    max_records = 0
+
+            start = time.time()
+            result = await self._query(api_call, params)
+            results.append(result)
+
+            more_rows = result["info"]["moreRows"]
+            limit = sizer.next_limit(result, limit, time.time() - start)
+
+        return results
+
+    async def _batch_parallel(
+        self, api_call, params, max_records, limit, offset, max_workers, sizer=None
+    ):
+        if sizer is None:
+            sizer = PageSizer()
+        first_limit = limit if max_records is None else min(limit, max_records)
+        first_params = dict(params)
+        first_params.update(self._get_param("true", "count"))
+        first_params.update(self._get_param(offset, "offset"))
+        first_params.update(self._get_param(first_limit, "limit"))
+        start = time.time()
+        first = await self._query(api_call, first_params)
+
+        results = [first]
+        offset += first_limit
+        limit = sizer.next_limit(first, limit, time.time() - start)
+        if max_records is not None:
+            max_records -= first_limit
+        if not first["info"]["moreRows"] or max_records == 0:
+            return results
+
+        if "rowCount" not in first["info"]:
+            # without a row count the remaining offsets cannot be planned up front
+            return results + await self._batch(
+                api_call, params, max_records, limit, offset, sizer
+            )
+
+        remaining = first["info"]["rowCount"] - offset
+        if max_records is not None:
+            remaining = min(remaining, max_records)
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(page_params):
+            async with semaphore:
+                return await self._query(api_call, page_params)
+
+        pages = []
+        while remaining > 0:
+            page_params = dict(params)
+            page_params.update(self._get_param(offset, "offset"))
+            page_params.update(self._get_param(min(limit, remaining), "limit"))
+            pages.append(fetch(page_params))
+            offset += limit
+            remaining -= limit
+
+        results.extend(await asyncio.gather(*pages))
+        return results
+
+
+async def _read_response(reader, url):
+    status_line = await reader.readline()
+    if not status_line:
+        raise asyncio.IncompleteReadError(status_line, None)
+    version, status, reason = (
+        status_line.decode("latin-1").rstrip("\r\n") + "  "
+    ).split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = (
+        version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    )
+    if int(status) in (204, 304) or 100 <= int(status) < 200:
+        # responses that never have a body, whatever their headers say
+        body = b""
+    elif "chunked" in headers.get("transfer-encoding", "").lower():
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+        body = bytes(body)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = await reader.read()
+        keep_alive = False
+
+    if headers.get("content-encoding", "").lower() in ("gzip", "x-gzip", "deflate"):
+        # 32 + MAX_WBITS detects either a gzip or a zlib header
+        body = zlib.decompress(body, 32 + zlib.MAX_WBITS)
+
+    return AsyncResponse(url, int(status), reason.strip(), headers, body, keep_alive)
+
+
+async def _exchange(connection, request, url):
+    reader, writer = connection
+    try:
+        writer.write(request)
+        return await _read_response(reader, url)
+    except BaseException:
+        # a connection left part way through a response, by an error or by a timeout
+        # cancelling the request, can't be reused
+        writer.close()
+        raise
+
+
+async def _open_tunnel(proxy_host, proxy_port, host, port):
+    # asks an HTTP proxy for a tunnel to the host, over which TLS is then started
+    loop = asyncio.get_running_loop()
+    address = (await loop.getaddrinfo(proxy_host, proxy_port, type=socket.SOCK_STREAM))[
+        0
+    ]
+    sock = socket.socket(address[0], address[1], address[2])
+    try:
+        sock.setblocking(False)
+        await loop.sock_connect(sock, address[4])
+        netloc = "%s:%d" % (host, port)
+        request = "CONNECT " + netloc + " HTTP/1.1\r\nHost: " + netloc + "\r\n\r\n"
+        await loop.sock_sendall(sock, request.encode("latin-1"))
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = await loop.sock_recv(sock, 4096)
+            if not chunk:
+                raise OSError("Tunnel connection failed: proxy closed the connection")
+            response += chunk
+        status_line = response.split(b"\r\n", 1)[0].decode("latin-1")
+        if status_line.split(" ", 2)[1:2] != ["200"]:
+            raise OSError("Tunnel connection failed: " + status_line)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+async def _get_json(api_call, api_key, transport):
+    headers = {}
+    if api_key is not None:
+        headers["X-API-KEY"] = api_key
+
+    attempt = 0
+    while True:
+        try:
+            response = await transport.open(api_call, headers)
+            if response.getcode() != 200:
+                raise RdsHTTPError(
+                    response.getcode(),
+                    response.reason,
+                    api_call,
+                    retry_after=parse_retry_after(response.headers.get("retry-after")),
+                )
+            return response.json()
+        except RdsError as error:
+            attempt += 1
+            delay = None
+            if transport.retry is not None:
+                delay = transport.retry.get_delay(error, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
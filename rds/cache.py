@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caches query results and metadata so repeated calls can be answered without the network
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    A persistent, directory based cache of query pages. Entries are keyed on the full query url
+    and the data product's last update, so they stop matching as soon as the server reports a
+    newer update. The least recently used entries are evicted once the cache grows past its
+    size limit.
+
+    Parameters
+    ----------
+    directory : str
+        The directory holding the cached pages, created if it does not exist.
+    max_size : int, optional
+        The largest total size of the cached pages in bytes. The default is 1 GB.
+    revalidate : float, optional
+        Seconds a data product's last update is trusted before it is looked up again. The
+        default is 60.
+    """
+
+    def __init__(self, directory, max_size=1024**3, revalidate=60):
+        self.directory = directory
+        self.max_size = max_size
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def get(self, url, last_update):
+        """
+        Gets a cached page.
+
+        Parameters
+        ----------
+        url : str
+            The full query url of the page.
+        last_update : str
+            The last update of the data product the page was queried from.
+
+        Returns
+        -------
+        page : JSON
+            The cached page or None if it is not cached.
+        """
+        path = self._path(url, last_update)
+        try:
+            with open(path, "r") as f:
+                page = json.load(f)
+            # the modified time doubles as the last access time for eviction
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return page
+
+    def put(self, url, last_update, page):
+        """
+        Caches a page, evicting the least recently used pages if the cache is full.
+
+        Parameters
+        ----------
+        url : str
+            The full query url of the page.
+        last_update : str
+            The last update of the data product the page was queried from.
+        page : JSON
+            The page to cache.
+        """
+        path = self._path(url, last_update)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(page, f)
+        size = os.path.getsize(temp_path)
+        replaced = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._size += size - replaced
+            if self._size > self.max_size:
+                self._evict()
+
+    def clear(self):
+        """Removes every cached page."""
+        with self._lock:
+            for path, _, _ in self._entries():
+                _remove(path)
+            self._size = 0
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats : dict
+            The hit, miss and eviction counters along with the current size in bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": self._size,
+            }
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self._size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self._size <= self.max_size:
+                break
+            if _remove(path):
+                self._size -= size
+                self.evictions += 1
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _path(self, url, last_update):
+        key = hashlib.sha256((url + "\n" + str(last_update)).encode("utf-8"))
+        return os.path.join(self.directory, key.hexdigest() + ".json")
+
+
+class MetadataCache:
+    """
+    An in-memory cache of metadata responses shared by a server's catalogs and data products.
+    Each entry expires after the time to live of its endpoint, and the least recently used
+    entries are evicted once the cache is full. Cached JSON is shared between callers and
+    should be treated as read-only.
+
+    Parameters
+    ----------
+    ttl : float, optional
+        Seconds an entry stays fresh when its endpoint has no time to live of its own. The
+        default is 300.
+    ttls : dict, optional
+        Seconds each endpoint's entries stay fresh, keyed by endpoint: root_catalog, info,
+        changelog, catalog, dataproduct, variable, classification, code and profile. The
+        default is None.
+    max_entries : int, optional
+        The largest number of entries held. The default is 1024.
+    """
+
+    def __init__(self, ttl=300, ttls=None, max_entries=1024):
+        self.ttl = ttl
+        self.ttls = dict(ttls) if ttls else {}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, endpoint, url):
+        """
+        Gets a fresh cached response.
+
+        Parameters
+        ----------
+        endpoint : str
+            The kind of metadata, like variable or classification.
+        url : str
+            The full url of the request.
+
+        Returns
+        -------
+        metadata : JSON
+            The cached response or None if it is not cached or has expired.
+        """
+        key = (endpoint, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, endpoint, url, metadata):
+        """
+        Caches a response for its endpoint's time to live.
+
+        Parameters
+        ----------
+        endpoint : str
+            The kind of metadata, like variable or classification.
+        url : str
+            The full url of the request.
+        metadata : JSON
+            The response to cache.
+        """
+        expires = time.time() + self.ttls.get(endpoint, self.ttl)
+        key = (endpoint, url)
+        with self._lock:
+            self._entries[key] = (expires, metadata)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, endpoint=None, prefix=None):
+        """
+        Removes cached responses, all of them when no arguments are given.
+
+        Parameters
+        ----------
+        endpoint : str, optional
+            Only remove responses of this kind of metadata. The default is None.
+        prefix : str, optional
+            Only remove responses whose url starts with this prefix, like a data product's
+            catalog url. The default is None.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if endpoint is not None and key[0] != endpoint:
+                    continue
+                if prefix is not None and not key[1].startswith(prefix):
+                    continue
+                del self._entries[key]
+
+    def stats(self):
+        """
+        Returns
+        -------
+        stats : dict
+            The hit, miss and eviction counters along with the number of entries.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+            }
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
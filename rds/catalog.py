@@ -3,10 +3,9 @@
 """
 Contains data products and catalog properties
 """
-import json
-
 from .dataproduct import DataProduct
-from .utility import get_response, check_valid
+from .transport import default_transport
+from .utility import get_json, check_valid
 
 
 #TODO pass api key to util methods
@@ -20,21 +19,57 @@ class Catalog:
         The url hosting an RDS server.
     catalog_id : str, required
         ID of the catalog, required
+    transport : Transport, optional
+        The pooled HTTP transport used for requests. Default is the shared transport
+    lazy : bool, optional
+        flag for deferring the metadata lookup that validates the ID and fills the name,
+        description and uri until one of them is first accessed. Data products retrieved from
+        the catalog are lazy as well. Default is False
+    cache : ResultCache, optional
+        The on-disk cache used by the catalog's data products. Default is None
+    metadata_cache : MetadataCache, optional
+        The in-memory cache of metadata lookups shared with the catalog's data products.
+        Default is None
     """
 
-    def __init__(self, api, api_key, catalog_id):
-        metadata = check_valid(
-            api + "/api/catalog/" + catalog_id, api_key, "Invalid catalog ID", is_json=True
-        )
+    def __init__(
+        self,
+        api,
+        api_key,
+        catalog_id,
+        transport=None,
+        lazy=False,
+        cache=None,
+        metadata_cache=None,
+    ):
+        if transport is None:
+            transport = default_transport()
         self.api = api
         self.api_key = api_key
         self.catalog_id = catalog_id
-        self.name = metadata["name"]
-        self.description = metadata["description"] if "description" in metadata else None
-        self.uri = metadata["uri"]
+        self.transport = transport
+        self.lazy = lazy
+        self.cache = cache
+        self.metadata_cache = metadata_cache
+        self._metadata = None
         # itll look itself up to make sure the ID exists and itll fill its description and name
+        if not lazy:
+            self._load_metadata()
+
+    @property
+    def name(self):
+        return self._load_metadata()["name"]
+
+    @property
+    def description(self):
+        metadata = self._load_metadata()
+        return metadata["description"] if "description" in metadata else None
 
-    def get_dataproduct(self, dataproduct_id):
+    @property
+    def uri(self):
+        return self._load_metadata()["uri"]
+
+    def get_dataproduct(self, dataproduct_id, lazy=None):
         """
         Gets a dataproduct.
         
@@ -42,13 +77,25 @@ class Catalog:
         ----------
         dataproduct_id : string
             ID of the dataproduct you want.
+        lazy : bool, optional
+            flag for deferring the data product's metadata lookup until it is needed. The
+            default is None which follows the catalog.
     
         Returns
         -------
         DataProduct
             An object that can retrieve data and metadata from RDS.
         """
-        return DataProduct(self.api, self.api_key, self.catalog_id, dataproduct_id)
+        return DataProduct(
+            self.api,
+            self.api_key,
+            self.catalog_id,
+            dataproduct_id,
+            transport=self.transport,
+            lazy=self.lazy if lazy is None else lazy,
+            cache=self.cache,
+            metadata_cache=self.metadata_cache,
+        )
 
     def get_metadata(self):
         """
@@ -61,5 +108,19 @@ class Catalog:
         """
         api_call = self.api + "/api/catalog/" + self.catalog_id
 
-        response = get_response(api_call, self.api_key)
-        return json.load(response)
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "catalog"
+        )
+
+    def _load_metadata(self):
+        if self._metadata is None:
+            self._metadata = check_valid(
+                self.api + "/api/catalog/" + self.catalog_id,
+                self.api_key,
+                "Invalid catalog ID",
+                is_json=True,
+                transport=self.transport,
+                metadata_cache=self.metadata_cache,
+                endpoint="catalog",
+            )
+        return self._metadata
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Saves the pages of a long running query as they complete so it can resume after a failure
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+
+class Checkpoint:
+    """
+    The completed pages of a single query, kept in their own folder of a checkpoint directory
+    so that several queries can share it. Pages are saved under the offset of their first
+    record and their record count rather than their limit, so a restarted query whose pages
+    are sized differently still reuses the records already fetched. The folder is keyed by
+    the data product's last update, so a restarted query only reuses pages of the same data.
+
+    Parameters
+    ----------
+    directory : str
+        The checkpoint directory, created if it does not exist.
+    query : str
+        The query url without its limit and offset, identifying the query across restarts.
+    last_update : str, optional
+        The last update of the data product being queried. The default is None.
+    """
+
+    def __init__(self, directory, query, last_update=None):
+        self.directory = os.path.join(directory, _hash(query + "\n" + str(last_update)))
+        self.last_update = last_update
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def get(self, query, offset):
+        """
+        Parameters
+        ----------
+        query : str
+            The page url without its limit and offset, which differs from the query's own
+            when it is split into partitions.
+        offset : int
+            The offset of a record.
+
+        Returns
+        -------
+        start : int
+            The offset of the first record of the saved page holding the record, or None.
+        page : JSON
+            The saved page holding the record, or None if none was saved.
+        """
+        for start, count in self._saved(query):
+            if start == offset or start < offset < start + count:
+                try:
+                    with open(self._path(query, start, count), "r") as f:
+                        return start, json.load(f)
+                except (IOError, OSError, ValueError):
+                    pass
+        return None, None
+
+    def next_offset(self, query, offset):
+        """Returns the offset of the first saved page starting after an offset, or None."""
+        following = [start for start, _ in self._saved(query) if start > offset]
+        return min(following) if following else None
+
+    def put(self, query, offset, page):
+        """Saves a completed page, replacing the file in one step so it is never partial."""
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as f:
+            json.dump(page, f)
+        os.replace(temp_path, self._path(query, offset, len(page["records"])))
+
+    def remove(self):
+        """Removes the saved pages once the query has completed."""
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            pass
+
+    def _saved(self, query):
+        # the offset and record count of every page saved for the page url
+        prefix = _hash(query) + "-"
+        saved = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".json"):
+                start, count = name[len(prefix) : -len(".json")].split("-")
+                saved.append((int(start), int(count)))
+        return saved
+
+    def _path(self, query, offset, count):
+        return os.path.join(
+            self.directory, "%s-%d-%d.json" % (_hash(query), offset, count)
+        )
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
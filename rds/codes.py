@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Looks up the codes of a classification by value or by label
+"""
+
+
+class CodeIndex:
+    """
+    The codes of a classification indexed both ways, from code value to label and from label
+    to code value. Built once from the complete code list and reused to build queries and to
+    decode results.
+
+    Parameters
+    ----------
+    classification : str
+        The ID of the classification.
+    codes : list of dict
+        The codes' metadata, each with a ``codeValue`` and a ``name``.
+    """
+
+    def __init__(self, classification, codes):
+        self.classification = classification
+        self.codes = codes
+        self.labels = {}
+        self.values = {}
+        for code in codes:
+            value = code["codeValue"]
+            label = code.get("name", value)
+            self.labels[value] = label
+            self.values.setdefault(label, value)
+            # codes of numeric variables come back as numbers in the records
+            try:
+                self.labels.setdefault(int(value), label)
+            except (TypeError, ValueError):
+                pass
+
+    def label(self, value, default=None):
+        """Returns the label of a code value, or the default when it is not a code."""
+        return self.labels.get(value, default)
+
+    def code(self, label, default=None):
+        """Returns the code value with a label, or the default when no code has it."""
+        return self.values.get(label, default)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, value):
+        return value in self.labels
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def __repr__(self):
+        return "CodeIndex(%r, %d codes)" % (self.classification, len(self.codes))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Builds typed NumPy column arrays from query records and converts them into pandas DataFrames
+or pyarrow Tables. NumPy, pandas and pyarrow are optional dependencies that are only needed
+when these conversions are asked for.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_INTEGER_TYPES = ("INTEGER", "INT", "LONG", "BIGINT", "SHORT", "SMALLINT", "BYTE")
+_DECIMAL_TYPES = ("DECIMAL", "DOUBLE", "FLOAT", "NUMERIC", "REAL", "NUMBER")
+_BOOLEAN_TYPES = ("BOOLEAN", "BOOL")
+_DATE_TYPES = ("DATE",)
+
+# the dtype, the null placeholder and the inferred dtype kinds accepted for each column kind
+_KIND_DTYPES = {
+    "int": ("int64", 0, "iub"),
+    "float": ("float64", 0.0, "iubf"),
+    "bool": ("bool", False, "b"),
+    "date": ("datetime64[D]", "1970-01-01", "U"),
+}
+
+
+class ColumnBuilder:
+    """
+    Accumulates records one page at a time into typed per-column arrays, so that the records
+    of earlier pages can be released as soon as they are appended.
+
+    Parameters
+    ----------
+    columns : list of str
+        The column names, in record order.
+    metadata : list of dict, optional
+        The RDS variable metadata of each column, used to pick dtypes. The default is None
+        which stores every column as objects.
+    """
+
+    def __init__(self, columns, metadata=None):
+        _require_numpy()
+        self.columns = columns
+        if metadata is None:
+            metadata = [None] * len(columns)
+        self.kinds = [get_kind(variable) for variable in metadata]
+        self._chunks = [[] for _ in columns]
+
+    def append(self, records):
+        """Converts a page of records into one chunk per column."""
+        if not records:
+            return
+        if hasattr(records, "column"):
+            # compact records are already stored a column at a time
+            columns = [records.column(index) for index in range(records.width)]
+        else:
+            columns = zip(*records)
+        for index, values in enumerate(columns):
+            kind = self.kinds[index]
+            try:
+                chunk = to_array(values, kind)
+            except (TypeError, ValueError):
+                # values that do not match their declared type, like injected labels
+                self.kinds[index] = kind = "object"
+                self._chunks[index] = [
+                    _to_objects(previous) for previous in self._chunks[index]
+                ]
+                chunk = to_array(values, kind)
+            self._chunks[index].append(chunk)
+
+    def build(self):
+        """
+        Returns
+        -------
+        arrays : dict
+            The column names mapped to NumPy arrays, masked where integer, boolean or date
+            columns hold nulls. Decimal nulls are NaN and object nulls are None.
+        """
+        arrays = {}
+        for name, kind, chunks in zip(self.columns, self.kinds, self._chunks):
+            if not chunks:
+                arrays[name] = to_array([], kind)
+            elif any(np.ma.isMaskedArray(chunk) for chunk in chunks):
+                arrays[name] = np.ma.concatenate(chunks)
+            else:
+                arrays[name] = np.concatenate(chunks)
+        return arrays
+
+
+def get_kind(variable):
+    """Maps the storage type of an RDS variable to a column kind."""
+    if not variable:
+        return "object"
+    storage_type = str(
+        variable.get("storageType") or variable.get("dataType") or ""
+    ).upper()
+    if storage_type in _INTEGER_TYPES:
+        return "int"
+    if storage_type in _DECIMAL_TYPES:
+        return "float"
+    if storage_type in _BOOLEAN_TYPES:
+        return "bool"
+    if storage_type in _DATE_TYPES:
+        return "date"
+    return "object"
+
+
+def to_array(values, kind):
+    """
+    Converts a sequence of values into a NumPy array of the given column kind, raising a
+    ValueError when the values do not fit it.
+    """
+    _require_numpy()
+    if kind == "object":
+        array = np.empty(len(values), dtype=object)
+        array[:] = list(values)
+        return array
+
+    dtype, fill, allowed = _KIND_DTYPES[kind]
+    mask = [value is None for value in values]
+    data = np.array([fill if value is None else value for value in values])
+    # inferring first keeps NumPy from silently parsing strings or truncating decimals
+    if data.size and data.dtype.kind not in allowed:
+        raise ValueError("Values do not fit a " + kind + " column")
+    data = data.astype(dtype)
+    if kind == "float":
+        data[mask] = np.nan
+    elif any(mask):
+        return np.ma.array(data, mask=mask)
+    return data
+
+
+def _to_objects(chunk):
+    array = np.empty(len(chunk), dtype=object)
+    if np.ma.isMaskedArray(chunk):
+        array[:] = [
+            None if masked else value
+            for value, masked in zip(chunk.data.tolist(), np.ma.getmaskarray(chunk))
+        ]
+    else:
+        array[:] = chunk.tolist()
+    return array
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "NumPy is required for columnar results, install it with pip install numpy"
+        )
+
+
+def to_pandas(arrays, metadata=None):
+    """
+    Builds a pandas DataFrame from column arrays. Masked integer and boolean columns become
+    nullable extension arrays and coded columns become categoricals. Requires pandas.
+    """
+    pd = _require("pandas")
+    if metadata is None:
+        metadata = [None] * len(arrays)
+
+    data = {}
+    for (name, array), variable in zip(arrays.items(), metadata):
+        if np.ma.isMaskedArray(array):
+            mask = np.ma.getmaskarray(array)
+            if array.dtype.kind in "iu":
+                array = pd.arrays.IntegerArray(array.data, mask)
+            elif array.dtype.kind == "b":
+                array = pd.arrays.BooleanArray(array.data, mask)
+            else:
+                array = array.filled(np.datetime64("NaT"))
+        elif _is_coded(variable) and array.dtype == object:
+            array = pd.Categorical(array)
+        data[name] = array
+    return pd.DataFrame(data, columns=list(arrays))
+
+
+def to_arrow(arrays, metadata=None):
+    """
+    Builds a pyarrow Table from column arrays. Nulls become Arrow nulls and coded columns are
+    dictionary encoded. Requires pyarrow.
+    """
+    pa = _require("pyarrow")
+    if metadata is None:
+        metadata = [None] * len(arrays)
+
+    columns = {}
+    for (name, array), variable in zip(arrays.items(), metadata):
+        if np.ma.isMaskedArray(array):
+            column = pa.array(array.data, mask=np.ma.getmaskarray(array))
+        else:
+            # from_pandas treats NaN as null, which is how decimal nulls are stored
+            column = pa.array(array, from_pandas=True)
+        if _is_coded(variable):
+            column = column.dictionary_encode()
+        columns[str(name)] = column
+    return pa.table(columns)
+
+
+def _is_coded(variable):
+    return bool(variable) and bool(variable.get("classification"))
+
+
+def _require(module):
+    _require_numpy()
+    try:
+        return __import__(module)
+    except ImportError:
+        raise ImportError(
+            module
+            + " is required for this conversion, install it with pip install "
+            + module
+        )
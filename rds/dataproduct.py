@@ -5,11 +5,29 @@ Retrieves data and metadata from RDS.
 """
 
 # Built-in/Generic Imports
-import sys
+import datetime
 import json
 import math
-
-from .utility import get_response, check_valid
+import time
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlencode
+
+from .checkpoint import Checkpoint
+from .codes import CodeIndex
+from .columnar import ColumnBuilder, to_arrow, to_pandas
+from .export import export_pages
+from .paging import PageSizer
+from .records import ChainedRecords, CompactRecords
+from .spill import SpillStore, SpilledRecords
+from .stats import QueryStats
+from .stream import StreamedPage, read_page
+from .exceptions import RdsError
+from .retry import RetryPolicy
+from .transport import Transport, default_transport
+from .utility import get_json, get_response, check_valid, wait_to_retry
 
 
 #TODO pass api key to util methods
@@ -25,22 +43,60 @@ class DataProduct:
         ID of the catalog, required
     dataproduct_id : str, optional
         ID of the data product. Default is None
+    transport : Transport, optional
+        The pooled HTTP transport used for requests. Default is the shared transport
+    lazy : bool, optional
+        flag for deferring the metadata lookup that validates the ID and fills the name,
+        description, last update and uri until one of them is first accessed. Default is False
+    cache : ResultCache, optional
+        The on-disk cache answering repeated select and tabulate queries. Cached pages are
+        invalidated when the data product's last update changes. Default is None
+    metadata_cache : MetadataCache, optional
+        The in-memory cache answering repeated metadata lookups. Default is None
     """
 
-    def __init__(self, api, api_key, catalog_id, dataproduct_id):
-        metadata = check_valid(
-            api + "/api/catalog/" + catalog_id + "/" + dataproduct_id,
-            api_key, "Invalid dataproduct ID",
-            is_json=True,
-        )
+    def __init__(
+        self,
+        api,
+        api_key,
+        catalog_id,
+        dataproduct_id,
+        transport=None,
+        lazy=False,
+        cache=None,
+        metadata_cache=None,
+    ):
+        if transport is None:
+            transport = default_transport()
         self.api = api
         self.api_key = api_key
         self.catalog_id = catalog_id
         self.dataproduct_id = dataproduct_id
-        self.name = metadata["name"]
-        self.description = metadata["description"]
-        self.last_update = metadata["lastUpdate"]
-        self.uri = metadata["uri"]
+        self.transport = transport
+        self.cache = cache
+        self.metadata_cache = metadata_cache
+        self._metadata = None
+        self._metadata_time = None
+        self._column_count = None
+        self._code_indexes = {}
+        if not lazy:
+            self._load_metadata()
+
+    @property
+    def name(self):
+        return self._load_metadata()["name"]
+
+    @property
+    def description(self):
+        return self._load_metadata()["description"]
+
+    @property
+    def last_update(self):
+        return self._load_metadata()["lastUpdate"]
+
+    @property
+    def uri(self):
+        return self._load_metadata()["uri"]
 
     def count(self):
         """
@@ -53,8 +109,9 @@ class DataProduct:
 
         """
         api_call = self._get_url("query") + "/count"
-        response = get_response(api_call, self.api_key)
-        return json.load(response)
+        return get_response(
+            api_call, self.api_key, transport=self.transport, parse=json.load
+        )
 
     def select(
         self,
@@ -71,6 +128,15 @@ class DataProduct:
         limit=None,
         offset=0,
         rds_format=None,
+        max_workers=None,
+        as_columns=False,
+        checkpoint=None,
+        page_sizer=None,
+        partition_by=None,
+        partitions=None,
+        compact=False,
+        processes=None,
+        spill=None,
     ):
         """
         Queries the data product for a set of records.
@@ -93,8 +159,11 @@ class DataProduct:
             columns to be weighed. The default is None.
         metadata : bool, optional
             flag for if metadata should be used/returned with the data frame. Setting this to false will also cause no column names to return in the results. The default is True.
-        inject : bool, optional
-            flag for if the code labels should be used over the code values. The default is False.
+        inject : bool or str, optional
+            flag for if the code labels should be used over the code values. Set to "client"
+            to receive the code values and replace them with labels locally, from each
+            classification's codes fetched once per data product, which keeps responses as
+            small as without labels. The default is False.
         count : bool, optional
             flag for returning the record count in the info. The default is False.
         limit : int, optional
@@ -103,6 +172,53 @@ class DataProduct:
             offset for the records in the data frame. The default is 0.
         rds_format : string, optional
             the format of the json object returned. The default is mtna_simple.
+        max_workers : int, optional
+            number of pages to fetch concurrently. The first page reports the row count so
+            the remaining pages can be planned and requested ahead on a bounded thread pool.
+            The default is None which fetches one page at a time.
+        as_columns : bool, optional
+            flag for converting each page into typed NumPy column arrays as it arrives. The
+            results then hold the arrays in ``arrays`` and no ``records``. Requires NumPy.
+            The default is False.
+        checkpoint : str, optional
+            a directory where each page is saved as it completes. Running the same query
+            again after a failure reuses the saved pages instead of fetching them, and the
+            pages are removed once the query completes. The default is None.
+        page_sizer : PageSizer, optional
+            sizes each page from the time and payload of the previous pages, within the
+            server's cell limit. The default is None which requests pages as large as the
+            server allows.
+        partition_by : str, optional
+            a numeric, date or coded column used to split the query into ranges that are
+            each filtered with ``where`` and paged from their own start, so no page needs a
+            deep offset. The ranges are fetched concurrently on ``max_workers`` threads and
+            merged in ascending order, followed by the records where the column is null.
+            The ranges come from the column's profile, or one per code for coded columns.
+            Records are ordered within each range. Cannot be combined with ``limit`` or
+            ``offset``. The default is None.
+        partitions : int, optional
+            the number of ranges a numeric or date column is split into. The default is None
+            which uses ``max_workers``, or 4 when that is not set.
+        compact : bool, optional
+            flag for storing the records as typed columns in a ``CompactRecords`` sequence
+            as each page arrives, holding the distinct strings of each column once. Records
+            are read back as lists at a fraction of the memory. The default is False.
+        processes : int, optional
+            number of worker processes that fetch and decode pages, for queries where
+            decoding JSON on one core is the bottleneck. Each worker hands its page back as
+            ``CompactRecords`` column arrays, which the results chain together without
+            decoding them again. Pages are planned as with ``max_workers``, which defaults to
+            ``processes``. The transport's rate limit, retries and observer apply to every
+            page. Pages are not read from or saved to the result cache, and ``checkpoint``
+            cannot be used. The default is None which decodes pages in this
+            process.
+        spill : str, optional
+            a directory where each page is written to disk one column per file as it
+            arrives. The results then hold the records in a ``SpilledRecords`` sequence read
+            through memory maps, so results larger than memory can be read and sliced, and
+            ``to_columns`` returns integer and decimal arrays that are views of the files.
+            The files are deleted when the records are closed or garbage collected. The
+            default is None which keeps the records in memory.
 
         Returns
         -------
@@ -110,36 +226,279 @@ class DataProduct:
             A wrapper object for the dataframe and metadata.
 
         """
-        api_call = self._get_url("query") + "/select?"
-        params = {}
-        params.update(self._get_param(cols, "cols"))
-        params.update(self._get_param(where, "where"))
-        params.update(self._get_param(orderby, "orderby"))
-        params.update(self._get_param(groupby, "groupby"))
-        params.update(self._get_param(collimit, "collimit"))
-        params.update(self._get_param(coloffset, "coloffset"))
-        params.update(self._get_param(weights, "weights"))
-        params.update(self._get_param(rds_format, "format"))
-        params.update(self._get_param(str(metadata).lower(), "metadata"))
-        params.update(self._get_param(str(inject).lower(), "inject"))
-        params.update(self._get_param(str(count).lower(), "count"))
+        if sum(1 for option in (as_columns, compact, spill) if option) > 1:
+            raise ValueError("Only one of as_columns, compact and spill can be used")
+        api_call, params = self._select_query(
+            cols,
+            where,
+            orderby,
+            groupby,
+            collimit,
+            coloffset,
+            weights,
+            metadata,
+            inject,
+            count,
+            rds_format,
+        )
+        recorder = self._recorder("select", api_call, params)
+        sizer = page_sizer if page_sizer is not None else PageSizer()
+        max_records, limit = self._page_limits(cols, collimit, limit, sizer)
+        fetch, checkpoint = self._checkpoint(api_call, params, checkpoint)
+
+        executor = None
+        if processes is not None and processes > 1:
+            if checkpoint is not None:
+                raise ValueError("checkpoint cannot be combined with processes")
+            executor = ProcessPoolExecutor(max_workers=processes)
+            fetch = partial(_fetch_in_process, executor, self.api_key, self.transport)
+            if max_workers is None:
+                max_workers = processes
+
+        try:
+            if partition_by is None:
+                results = self._iter_batch(
+                    api_call,
+                    params,
+                    max_records,
+                    limit,
+                    offset,
+                    max_workers,
+                    fetch,
+                    sizer,
+                )
+            else:
+                if max_records is not None or offset:
+                    raise ValueError(
+                        "limit and offset cannot be combined with partition_by"
+                    )
+                results = self._batch_partitioned(
+                    api_call,
+                    params,
+                    partition_by,
+                    partitions,
+                    limit,
+                    max_workers,
+                    fetch,
+                    sizer,
+                )
+            if recorder is not None:
+                results = recorder.count(results)
+            if inject == "client":
+                results = self._inject_labels(results)
+
+            if as_columns or compact or spill:
+                if as_columns:
+                    results = _get_columnar_results(results, metadata, count)
+                elif compact:
+                    results = _get_compact_results(results, metadata, count)
+                else:
+                    results = _get_spilled_results(results, metadata, count, spill)
+                if checkpoint is not None:
+                    checkpoint.remove()
+                if recorder is not None:
+                    recorder.report()
+                return results
+
+            results = list(results)
+            if checkpoint is not None:
+                checkpoint.remove()
+            return self._assemble(results, metadata, count, recorder)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def iter_pages(
+        self,
+        cols=None,
+        where=None,
+        orderby=None,
+        groupby=None,
+        collimit=None,
+        coloffset=0,
+        weights=None,
+        metadata=True,
+        inject=False,
+        count=False,
+        limit=None,
+        offset=0,
+        rds_format=None,
+        max_workers=None,
+        checkpoint=None,
+        page_sizer=None,
+    ):
+        """
+        Queries the data product for a set of records, yielding the results one page at a
+        time as each page arrives. Takes the same parameters as ``select``.
 
-        max_records = limit
-        col_count = self._get_column_count(cols, collimit)
-        if limit == None or limit * col_count > 10000:
-            limit = math.floor(10000 / col_count)
+        Returns
+        -------
+        pages : generator of RdsResults
+            A wrapper object for the records of each page and their metadata.
 
-        results = self._batch(api_call, params, max_records, limit, offset)
+        """
+        api_call, params = self._select_query(
+            cols,
+            where,
+            orderby,
+            groupby,
+            collimit,
+            coloffset,
+            weights,
+            metadata,
+            inject,
+            count,
+            rds_format,
+        )
+        sizer = page_sizer if page_sizer is not None else PageSizer()
+        max_records, limit = self._page_limits(cols, collimit, limit, sizer)
+        fetch, checkpoint = self._checkpoint(api_call, params, checkpoint)
+        recorder = self._recorder("select", api_call, params)
 
-        metadata_json = None
-        if metadata:
-            metadata_json = _get_metadata(results)
+        pages = self._iter_batch(
+            api_call, params, max_records, limit, offset, max_workers, fetch, sizer
+        )
+        if recorder is not None:
+            pages = recorder.count(pages)
+        if inject == "client":
+            pages = self._inject_labels(pages)
 
         count_value = None
-        if count:
-            count_value = results[0]["info"]["rowCount"]
+        for result in pages:
+            if count and count_value is None:
+                count_value = result["info"]["rowCount"]
+
+            metadata_json = None
+            if metadata:
+                metadata_json = _get_metadata([result])
+
+            yield _get_rds_results([result], metadata_json, count_value)
+
+        if checkpoint is not None:
+            checkpoint.remove()
+        if recorder is not None:
+            recorder.report()
+
+    def iter_select(
+        self,
+        cols=None,
+        where=None,
+        orderby=None,
+        groupby=None,
+        collimit=None,
+        coloffset=0,
+        weights=None,
+        metadata=True,
+        inject=False,
+        count=False,
+        limit=None,
+        offset=0,
+        rds_format=None,
+        max_workers=None,
+        page_sizer=None,
+    ):
+        """
+        Queries the data product for a set of records, yielding each record as its page
+        arrives so that no more than a page or two is held in memory. When pages are fetched
+        one at a time and not cached, records are decoded straight from the response as it
+        is read, so the first record is available before the rest of its page has arrived.
+        Takes the same parameters as ``select``.
+
+        Returns
+        -------
+        records : generator of list
+            The records of the query in order.
+
+        """
+        api_call, params = self._select_query(
+            cols,
+            where,
+            orderby,
+            groupby,
+            collimit,
+            coloffset,
+            weights,
+            metadata,
+            inject,
+            count,
+            rds_format,
+        )
+        sizer = page_sizer if page_sizer is not None else PageSizer()
+        max_records, limit = self._page_limits(cols, collimit, limit, sizer)
+
+        recorder = self._recorder("select", api_call, params)
+
+        # labels are injected from the variables of whole pages, so those are not streamed
+        if (
+            self.cache is not None
+            or (max_workers is not None and max_workers > 1)
+            or inject == "client"
+        ):
+            pages = self._iter_batch(
+                api_call, params, max_records, limit, offset, max_workers, None, sizer
+            )
+            if recorder is not None:
+                pages = recorder.count(pages)
+            if inject == "client":
+                pages = self._inject_labels(pages)
+            for result in pages:
+                for record in result["records"]:
+                    yield record
+        else:
+            for page in self._iter_batch_serial(
+                api_call, params, max_records, limit, offset, self._stream, sizer
+            ):
+                try:
+                    for record in page.records():
+                        yield record
+                finally:
+                    page.close()
+                if recorder is not None:
+                    recorder.pages += 1
+                    recorder.rows += page.count
+
+        if recorder is not None:
+            recorder.report()
+
+    def select_frame(self, *args, **kwargs):
+        """
+        Queries the data product for a set of records and returns them as a pandas DataFrame.
+        Each page is converted into column arrays as it arrives, so the records are never
+        collected into lists. Takes the same parameters as ``select``. Requires NumPy and
+        pandas.
+
+        Returns
+        -------
+        dataframe : pandas.DataFrame
+            One column per variable, with coded variables as categoricals.
+
+        """
+        kwargs["as_columns"] = True
+        return self.select(*args, **kwargs).to_pandas()
+
+    def export(self, path, format="csv", **kwargs):
+        """
+        Queries the data product for a set of records and writes them to a file one page at a
+        time, so that only a few pages are ever held in memory. The next pages are fetched
+        while the current one is written. Takes the same keyword parameters as
+        ``iter_pages``.
+
+        Parameters
+        ----------
+        path : str, required
+            the file to write.
+        format : str, optional
+            either csv, with a header row of the column names, or parquet, with one row group
+            per page and column types taken from the variable metadata. Parquet requires
+            NumPy and pyarrow. The default is csv.
+
+        Returns
+        -------
+        int
+            The number of records written.
 
-        return _get_rds_results(results, metadata_json, count_value)
+        """
+        return export_pages(self.iter_pages(**kwargs), path, format)
 
     def tabulate(
         self,
@@ -177,8 +536,9 @@ class DataProduct:
             flag for if the totals should be returned with the data frame. The default is False.
         metadata : bool, optional
             flag for if metadata should be used/returned with the data frame. The default is True.
-        inject : bool, optional
-            flag for if the code labels should be used over the code values. The default is False.
+        inject : bool or str, optional
+            flag for if the code labels should be used over the code values. Set to "client"
+            to replace the codes with labels locally as in ``select``. The default is False.
         count : bool, optional
             flag for returning the record count in the info. The default is False.
         rds_format : string, optional
@@ -189,31 +549,27 @@ class DataProduct:
         results : object
             A wrapper object for the dataframe and metadata.
         """
-        api_call = self._get_url("query") + "/tabulate?"
-        params = {}
-        params.update(self._get_param(dims, "dims"))
-        params.update(self._get_param(measure, "measure"))
-        params.update(self._get_param(where, "where"))
-        params.update(self._get_param(orderby, "orderby"))
-        params.update(self._get_param(groupby, "groupby"))
-        params.update(self._get_param(weights, "weights"))
-        params.update(self._get_param(rds_format, "format"))
-        params.update(self._get_param(str(metadata).lower(), "metadata"))
-        params.update(self._get_param(str(inject).lower(), "inject"))
-        params.update(self._get_param(str(totals).lower(), "totals"))
-        params.update(self._get_param(str(count).lower(), "count"))
-
-        results = [_query(api_call, self.api_key, params)]
-
-        metadata_json = None
-        if metadata:
-            metadata_json = _get_metadata(results)
-
-        count_value = None
-        if count:
-            count_value = results[0]["info"]["rowCount"]
+        api_call, params = self._tabulate_query(
+            dims,
+            measure,
+            where,
+            orderby,
+            groupby,
+            weights,
+            totals,
+            metadata,
+            inject,
+            count,
+            rds_format,
+        )
 
-        return _get_rds_results(results, metadata_json, count_value)
+        recorder = self._recorder("tabulate", api_call, params)
+        results = [self._fetch(api_call, params)]
+        if recorder is not None:
+            results = list(recorder.count(results))
+        if inject == "client":
+            results = list(self._inject_labels(results))
+        return self._assemble(results, metadata, count, recorder)
 
     def get_variable(self, variable=None):
         """
@@ -237,8 +593,9 @@ class DataProduct:
         else:
             api_call += "/variable/" + variable
 
-        response = get_response(api_call, self.api_key)
-        return json.load(response)
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "variable"
+        )
 
     def get_classification(self, classification=None):
         """
@@ -262,10 +619,15 @@ class DataProduct:
         else:
             api_call += "/classification/" + classification
 
-        response = get_response(api_call, self.api_key)
-        return json.load(response)
+        return get_json(
+            api_call,
+            self.api_key,
+            self.transport,
+            self.metadata_cache,
+            "classification",
+        )
 
-    def get_code(self, classification, limit=20):
+    def get_code(self, classification, limit=20, offset=0):
         """
         Gets the metadata for codes in JSON format.
 
@@ -275,6 +637,8 @@ class DataProduct:
             The name of the classification you want the codes' metadata of.
         limit : int, optional
             The amount of codes you want returned. The default is 20.
+        offset : int, optional
+            The number of codes skipped before the first one returned. The default is 0.
 
         Returns
         -------
@@ -287,8 +651,93 @@ class DataProduct:
         )
         params = {}
         params.update(self._get_param(limit, "limit"))
+        if offset:
+            params.update(self._get_param(offset, "offset"))
 
-        return _query(api_call, self.api_key, params)
+        return get_json(
+            _encode(api_call, params),
+            self.api_key,
+            self.transport,
+            self.metadata_cache,
+            "code",
+        )
+
+    def get_codes(self, classification, page_size=1000, max_workers=None):
+        """
+        Gets the metadata for every code of a classification, however many there are, by
+        requesting them one page at a time.
+
+        Parameters
+        ----------
+        classification : str
+            The name of the classification you want the codes' metadata of.
+        page_size : int, optional
+            The number of codes requested per page. The default is 1000.
+        max_workers : int, optional
+            number of pages to fetch concurrently, planned from the classification's code
+            count. The default is None which fetches one page at a time.
+
+        Returns
+        -------
+        codes : list of dict
+            Detailed information surrounding every code, in order.
+
+        """
+        code_count = self.get_classification(classification).get("codeCount")
+        if code_count is None:
+            codes = []
+            while True:
+                page = self.get_code(classification, page_size, len(codes))
+                codes.extend(page)
+                if len(page) < page_size:
+                    return codes
+
+        if max_workers is None or max_workers <= 1:
+            return self._get_code_range(classification, page_size, 0, code_count)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pages = executor.map(
+                lambda offset: self._get_code_range(
+                    classification,
+                    page_size,
+                    offset,
+                    min(offset + page_size, code_count),
+                ),
+                range(0, code_count, page_size),
+            )
+            return [code for page in pages for code in page]
+
+    def _get_code_range(self, classification, page_size, start, stop):
+        # the server may return fewer codes than asked for, so each page starts where the
+        # previous one ended until the range is complete or the codes run out
+        codes = []
+        while start < stop:
+            page = self.get_code(classification, min(page_size, stop - start), start)
+            if not page:
+                break
+            codes.extend(page)
+            start += len(page)
+        return codes
+
+    def get_code_index(self, classification):
+        """
+        Gets every code of a classification indexed by code value and by label. The index is
+        built once per data product and reused by later calls, queries and label injection.
+
+        Parameters
+        ----------
+        classification : str
+            The name of the classification you want the codes of.
+
+        Returns
+        -------
+        index : CodeIndex
+            Maps code values to labels and labels to code values.
+
+        """
+        if classification not in self._code_indexes:
+            codes = self.get_codes(classification)
+            self._code_indexes[classification] = CodeIndex(classification, codes)
+        return self._code_indexes[classification]
 
     def profile(self, variable):
         """
@@ -307,8 +756,9 @@ class DataProduct:
         """
         api_call = self._get_url("catalog") + "/variables/profile?cols=" + variable
 
-        response = get_response(api_call, self.api_key)
-        return json.load(response)
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "profile"
+        )
 
     def get_metadata(self):
         """
@@ -322,26 +772,217 @@ class DataProduct:
         """
         api_call = self._get_url("catalog")
 
-        response = get_response(api_call, self.api_key)
-        return json.load(response)
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "dataproduct"
+        )
+
+    def _load_metadata(self):
+        if self._metadata is None:
+            self._metadata = check_valid(
+                self.api
+                + "/api/catalog/"
+                + self.catalog_id
+                + "/"
+                + self.dataproduct_id,
+                self.api_key,
+                "Invalid dataproduct ID",
+                is_json=True,
+                transport=self.transport,
+                metadata_cache=self.metadata_cache,
+                endpoint="dataproduct",
+            )
+            self._metadata_time = time.time()
+        return self._metadata
+
+    def _fetch(self, api_call, params, checkpoint=None):
+        if checkpoint is not None:
+            return self._fetch_checkpointed(api_call, params, checkpoint)
+
+        if self.cache is None:
+            return _query(api_call, self.api_key, params, self.transport)
+
+        url = _encode(api_call, params)
+        last_update = self._get_last_update()
+        result = self.cache.get(url, last_update)
+        if result is None:
+            result = _query(api_call, self.api_key, params, self.transport)
+            self.cache.put(url, last_update, result)
+        return result
+
+    def _fetch_checkpointed(self, api_call, params, checkpoint):
+        # the page is put together from the saved pages covering its records, which may
+        # have been sized differently, and only the records missing are requested
+        query = _encode(
+            api_call,
+            {k: v for k, v in params.items() if k not in ("offset", "limit", "count")},
+        )
+        offset = int(params.get("offset", 0))
+        end = offset + int(params["limit"])
+        pieces = []
+        more_rows = True
+        while offset < end and more_rows:
+            start, page = checkpoint.get(query, offset)
+            if page is None:
+                following = checkpoint.next_offset(query, offset)
+                page_params = dict(params)
+                page_params.update(self._get_param(offset, "offset"))
+                page_params.update(
+                    self._get_param(min(end, following or end) - offset, "limit")
+                )
+                start, page = offset, self._fetch(api_call, page_params)
+                checkpoint.put(query, offset, page)
+            records = page["records"][offset - start : end - start]
+            more_rows = page["info"]["moreRows"] or (
+                offset - start + len(records) < len(page["records"])
+            )
+            pieces.append((page, records))
+            offset += len(records)
+            if not records:
+                break
+
+        page, records = pieces[0]
+        if len(pieces) == 1 and len(records) == len(page["records"]):
+            return page
+        result = dict(page)
+        result["info"] = dict(page["info"], moreRows=more_rows)
+        result["records"] = [record for _, records in pieces for record in records]
+        return result
+
+    def _checkpoint(self, api_call, params, directory):
+        if directory is None:
+            return None, None
+        checkpoint = Checkpoint(directory, _encode(api_call, params), self.last_update)
+        return partial(self._fetch, checkpoint=checkpoint), checkpoint
+
+    def _recorder(self, kind, api_call, params):
+        observer = getattr(self.transport, "observer", None)
+        if observer is None:
+            return None
+        return _QueryRecorder(observer, kind, _encode(api_call, params))
+
+    def _assemble(self, results, metadata, count, recorder=None):
+        start = time.perf_counter()
+        metadata_json = None
+        if metadata:
+            metadata_json = _get_metadata(results)
+
+        count_value = None
+        if count:
+            count_value = results[0]["info"]["rowCount"]
+
+        results = _get_rds_results(results, metadata_json, count_value)
+        if recorder is not None:
+            recorder.assemble_time = time.perf_counter() - start
+            recorder.report()
+        return results
+
+    def _stream(self, api_call, params):
+        url = _encode(api_call, params)
+
+        def reopen(error, attempt):
+            # a page dropped part way is requested again and its read records skipped
+            wait_to_retry(self.transport, error, attempt)
+            return get_response(url, self.api_key, transport=self.transport)
+
+        response = get_response(url, self.api_key, transport=self.transport)
+        return StreamedPage(response, reopen=reopen)
+
+    def _get_last_update(self):
+        # looks the last update up again once the cache stops trusting it
+        if (
+            self._metadata_time is not None
+            and time.time() - self._metadata_time >= self.cache.revalidate
+        ):
+            self._metadata = None
+            if self.metadata_cache is not None:
+                # the cached metadata would answer with the same last update
+                self.metadata_cache.invalidate(
+                    "dataproduct", prefix=self._get_url("catalog")
+                )
+        return self.last_update
+
+    def _select_query(
+        self,
+        cols,
+        where,
+        orderby,
+        groupby,
+        collimit,
+        coloffset,
+        weights,
+        metadata,
+        inject,
+        count,
+        rds_format,
+    ):
+        api_call = self._get_url("query") + "/select?"
+        params = {}
+        params.update(self._get_param(cols, "cols"))
+        params.update(self._get_param(where, "where"))
+        params.update(self._get_param(orderby, "orderby"))
+        params.update(self._get_param(groupby, "groupby"))
+        params.update(self._get_param(collimit, "collimit"))
+        params.update(self._get_param(coloffset, "coloffset"))
+        params.update(self._get_param(weights, "weights"))
+        params.update(self._get_param(rds_format, "format"))
+        params.update(_inject_params(metadata, inject))
+        params.update(self._get_param(str(count).lower(), "count"))
+        return api_call, params
+
+    def _tabulate_query(
+        self,
+        dims,
+        measure,
+        where,
+        orderby,
+        groupby,
+        weights,
+        totals,
+        metadata,
+        inject,
+        count,
+        rds_format,
+    ):
+        api_call = self._get_url("query") + "/tabulate?"
+        params = {}
+        params.update(self._get_param(dims, "dims"))
+        params.update(self._get_param(measure, "measure"))
+        params.update(self._get_param(where, "where"))
+        params.update(self._get_param(orderby, "orderby"))
+        params.update(self._get_param(groupby, "groupby"))
+        params.update(self._get_param(weights, "weights"))
+        params.update(self._get_param(rds_format, "format"))
+        params.update(_inject_params(metadata, inject))
+        params.update(self._get_param(str(totals).lower(), "totals"))
+        params.update(self._get_param(str(count).lower(), "count"))
+        return api_call, params
+
+    def _page_limits(self, cols, collimit, limit, sizer):
+        max_records = limit
+        ceiling = sizer.get_ceiling(self._get_column_count(cols, collimit))
+        if limit == None or limit > ceiling:
+            limit = ceiling
+        return max_records, limit
 
     def _get_column_count(self, cols, collimit):
-        col_count = None
         if cols == None:
-            col_count_api_call = self._get_url("query") + "/select?"
-            col_count_params = {}
-            col_count_params.update(self._get_param(1, "limit"))
-
-            col_count_results = _query(col_count_api_call, self.api_key, col_count_params)
-            col_count = len(col_count_results["records"][0])
+            if self._column_count is None:
+                self._column_count = len(self._get_variables())
+            col_count = self._column_count
         else:
-            col_count = len(cols)
-            
+            col_count = _count_columns(cols)
+
         if collimit == None:
             return col_count
         else:
             return col_count if col_count < collimit else collimit
 
+    def _get_variables(self):
+        # the data product's metadata lists its variables, avoiding a request when it is loaded
+        if self._metadata is not None and "variables" in self._metadata:
+            return self._metadata["variables"]
+        return _variable_list(self.get_variable())
+
     def _get_url(self, endpoint):
         if self.catalog_id is None:
             raise ValueError("Catalog ID must be specified")
@@ -374,14 +1015,149 @@ class DataProduct:
         else:
             return {}
 
-    def _batch(self, api_call, params, max_records, limit, offset=0):
-        results = []
+    def _batch(
+        self,
+        api_call,
+        params,
+        max_records,
+        limit,
+        offset=0,
+        max_workers=None,
+        fetch=None,
+        sizer=None,
+    ):
+        return list(
+            self._iter_batch(
+                api_call, params, max_records, limit, offset, max_workers, fetch, sizer
+            )
+        )
+
+    def _iter_batch(
+        self,
+        api_call,
+        params,
+        max_records,
+        limit,
+        offset=0,
+        max_workers=None,
+        fetch=None,
+        sizer=None,
+    ):
+        if max_workers is not None and max_workers > 1:
+            return self._iter_batch_parallel(
+                api_call, params, max_records, limit, offset, max_workers, fetch, sizer
+            )
+        return self._iter_batch_serial(
+            api_call, params, max_records, limit, offset, fetch, sizer
+        )
+
+    def _batch_partitioned(
+        self, api_call, params, column, partitions, limit, max_workers, fetch, sizer
+    ):
+        if partitions is None:
+            partitions = max_workers or 4
+        clauses = self._partition_clauses(column, partitions)
+
+        where = params.get("where")
+        if where is not None and " or " in where.lower():
+            where = "(" + where + ")"
+
+        def fetch_partition(clause):
+            # every range is paged from its own start, keeping offsets shallow
+            partition_params = dict(params)
+            partition_params["where"] = (
+                clause if where is None else where + " and " + clause
+            )
+            return self._batch(
+                api_call, partition_params, None, limit, 0, None, fetch, sizer
+            )
+
+        executor = ThreadPoolExecutor(max_workers=max_workers or len(clauses))
+        try:
+            partitioned = list(executor.map(fetch_partition, clauses))
+        finally:
+            executor.shutdown()
+
+        results = [result for pages in partitioned for result in pages]
+        if "rowCount" in results[0]["info"]:
+            # the first page reports the count of the whole query instead of its range
+            total = sum(pages[0]["info"].get("rowCount", 0) for pages in partitioned)
+            results[0]["info"] = dict(results[0]["info"], rowCount=total)
+        return results
+
+    def _partition_clauses(self, column, partitions):
+        profile = _variable_list(self.profile(column))
+        if isinstance(profile, list):
+            profile = profile[0] if profile else {}
+        minimum, maximum = profile.get("minimum"), profile.get("maximum")
+
+        bounds = None
+        if minimum is not None and maximum is not None:
+            bounds = _partition_bounds(minimum, maximum, partitions)
+
+        clauses = []
+        if bounds is not None:
+            last = len(bounds) - 2
+            for index in range(last + 1):
+                clauses.append(
+                    column
+                    + ">="
+                    + bounds[index]
+                    + " and "
+                    + column
+                    + ("<=" if index == last else "<")
+                    + bounds[index + 1]
+                )
+        else:
+            # text variables have no range, coded ones are split by code instead
+            clauses = self._code_clauses(column)
+
+        # the ranges never match nulls so they get a partition of their own
+        clauses.append(column + "=")
+        return clauses
+
+    def _code_clauses(self, column):
+        classification = (self.get_variable(column) or {}).get("classification")
+        if not classification:
+            raise ValueError(
+                "Cannot partition on ["
+                + column
+                + "], it is not numeric, a date or coded."
+            )
+        codes = self.get_code_index(classification.get("id", column))
+        if not len(codes):
+            raise ValueError("Cannot partition on [" + column + "], it has no codes.")
+        return [column + "=" + str(code["codeValue"]) for code in codes]
+
+    def _inject_labels(self, results):
+        # replaces the codes of coded columns with their labels, a page at a time
+        coded = None
+        for result in results:
+            if coded is None:
+                coded = []
+                for index, variable in enumerate(result.get("variables") or []):
+                    classification = variable.get("classification")
+                    if classification:
+                        codes = self.get_code_index(classification["id"])
+                        coded.append((index, codes.labels))
+            for index, labels in coded:
+                _map_codes(result["records"], index, labels)
+                _map_codes(result.get("totals") or [], index, labels)
+            yield result
+
+    def _iter_batch_serial(
+        self, api_call, params, max_records, limit, offset=0, fetch=None, sizer=None
+    ):
+        if fetch is None:
+            fetch = self._fetch
+        if sizer is None:
+            sizer = PageSizer()
+        params = dict(params)
 
         first_pass = True
         more_rows = True
         while (first_pass or more_rows) and (max_records == None or max_records > 0):
             first_pass = False
-            api_call_copy = api_call
             params.update(self._get_param(offset, "offset"))
 
             if max_records == None:
@@ -396,23 +1172,170 @@ class DataProduct:
                     params.update(self._get_param(max_records, "limit"))
                     max_records = 0
 
-            result = _query(api_call_copy, self.api_key, params)
-            results.append(result)
+            result, elapsed = _timed(fetch, api_call, params)
+            # a streamed page only reaches its info once its records have been consumed
+            yield result
 
+            if isinstance(result, StreamedPage):
+                elapsed += result.elapsed
             more_rows = result["info"]["moreRows"]
+            limit = sizer.next_limit(result, limit, elapsed)
 
-        return results
+    def _iter_batch_parallel(
+        self,
+        api_call,
+        params,
+        max_records,
+        limit,
+        offset,
+        max_workers,
+        fetch=None,
+        sizer=None,
+    ):
+        if fetch is None:
+            fetch = self._fetch
+        if sizer is None:
+            sizer = PageSizer()
+        first_limit = limit if max_records is None else min(limit, max_records)
+        first_params = dict(params)
+        first_params.update(self._get_param("true", "count"))
+        first_params.update(self._get_param(offset, "offset"))
+        first_params.update(self._get_param(first_limit, "limit"))
+        first, elapsed = _timed(fetch, api_call, first_params)
+        yield first
+
+        offset += first_limit
+        limit = sizer.next_limit(first, limit, elapsed)
+        if max_records is not None:
+            max_records -= first_limit
+        if not first["info"]["moreRows"] or max_records == 0:
+            return
+
+        if "rowCount" not in first["info"]:
+            # without a row count the remaining offsets cannot be planned up front
+            for result in self._iter_batch_serial(
+                api_call, params, max_records, limit, offset, fetch, sizer
+            ):
+                yield result
+            return
+
+        remaining = first["info"]["rowCount"] - offset
+        if max_records is not None:
+            remaining = min(remaining, max_records)
+
+        # only max_workers pages are requested ahead of the consumer so memory stays bounded
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while remaining > 0 or pending:
+                while remaining > 0 and len(pending) < max_workers:
+                    page_params = dict(params)
+                    page_params.update(self._get_param(offset, "offset"))
+                    page_params.update(self._get_param(min(limit, remaining), "limit"))
+                    pending.append(
+                        executor.submit(_timed, fetch, api_call, page_params)
+                    )
+                    offset += limit
+                    remaining -= limit
+                # pages not yet requested are sized from the pages that have arrived
+                result, elapsed = pending.popleft().result()
+                limit = sizer.next_limit(result, limit, elapsed)
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
 
 
 class RdsResults:
     """A wrapper object that binds the records, the column names, and metadata on the columns together."""
 
-    def __init__(self, records, columns, metadata, totals=None, count=None):
+    def __init__(
+        self, records, columns, metadata, totals=None, count=None, arrays=None
+    ):
         self.records = records
         self.columns = columns
         self.metadata = metadata
         self.totals = totals
         self.count = count
+        self.arrays = arrays
+
+    def to_columns(self):
+        """
+        Gets the records as one typed NumPy array per column. Requires NumPy.
+
+        Returns
+        -------
+        arrays : dict
+            The column names mapped to their arrays. Integer, boolean and date columns holding
+            nulls are masked arrays, decimal nulls are NaN. Columns are keyed by position when
+            the query returned no metadata. Spilled integer and decimal columns are views of
+            their memory mapped files, masked where they hold nulls, their other columns are
+            read into memory as arrays of objects.
+        """
+        if self.arrays is None and isinstance(self.records, SpilledRecords):
+            self.arrays = self.records.to_numpy(self.columns)
+        if self.arrays is None:
+            width = len(self.records[0]) if self.records else 0
+            columns = self.columns if self.columns is not None else list(range(width))
+            builder = ColumnBuilder(columns, self.metadata)
+            builder.append(self.records)
+            self.arrays = builder.build()
+        return self.arrays
+
+    def to_pandas(self):
+        """
+        Gets the results as a pandas DataFrame built from the column arrays, without going
+        through the list of records again. Requires NumPy and pandas.
+
+        Returns
+        -------
+        dataframe : pandas.DataFrame
+            One column per variable, with coded variables as categoricals.
+        """
+        return to_pandas(self.to_columns(), self.metadata)
+
+    def to_arrow(self):
+        """
+        Gets the results as a pyarrow Table built from the column arrays. Requires NumPy and
+        pyarrow.
+
+        Returns
+        -------
+        table : pyarrow.Table
+            One column per variable, with coded variables dictionary encoded.
+        """
+        return to_arrow(self.to_columns(), self.metadata)
+
+
+class _QueryRecorder:
+    # counts the pages and records of a query and reports its totals to an observer
+    def __init__(self, observer, kind, url):
+        self.observer = observer
+        self.kind = kind
+        self.url = url
+        self.pages = 0
+        self.rows = 0
+        self.assemble_time = 0.0
+        self.start = time.perf_counter()
+
+    def count(self, results):
+        for result in results:
+            self.pages += 1
+            self.rows += len(result["records"])
+            yield result
+
+    def report(self):
+        self.observer.on_query(
+            QueryStats(
+                self.kind,
+                self.url,
+                self.pages,
+                self.rows,
+                time.perf_counter() - self.start,
+                self.assemble_time,
+            )
+        )
 
 
 def _get_metadata(results):
@@ -430,18 +1353,130 @@ def _get_metadata(results):
     return metadata
 
 
-def _query(api_call, api_key, params):
-    if sys.version_info > (3, 0):
-        import urllib.parse
+def _inject_params(metadata, inject):
+    # client side injection asks for the codes along with the variables that classify them
+    if inject == "client":
+        return {"metadata": "true", "inject": "false"}
+    return {"metadata": str(metadata).lower(), "inject": str(inject).lower()}
+
+
+def _map_codes(records, index, labels):
+    if isinstance(records, CompactRecords):
+        records.map_column(index, labels)
+        return
+    get = labels.get
+    for record in records:
+        value = record[index]
+        if value is not None:
+            record[index] = get(value, value)
+
+
+def _count_columns(cols):
+    if type(cols) is list:
+        return len(cols)
+    return len(str(cols).split(","))
+
+
+def _variable_list(variables):
+    if isinstance(variables, dict) and "variables" in variables:
+        return variables["variables"]
+    return variables
+
+
+def _partition_bounds(minimum, maximum, partitions):
+    # the edges of equal ranges between the minimum and maximum, None when they are unordered
+    if isinstance(minimum, bool) or isinstance(maximum, bool):
+        return None
+    if isinstance(minimum, int) and isinstance(maximum, int):
+        step = max(int(math.ceil((maximum - minimum + 1) / float(partitions))), 1)
+        edges = list(range(minimum, maximum, step)) or [minimum]
+        return [str(edge) for edge in edges + [maximum]]
+    if isinstance(minimum, (int, float)) and isinstance(maximum, (int, float)):
+        step = (maximum - minimum) / float(partitions)
+        edges = [minimum + step * index for index in range(partitions)]
+        edges = sorted(set(edges)) if step else [minimum]
+        return [repr(float(edge)) for edge in edges + [maximum]]
+    try:
+        first = datetime.date.fromisoformat(str(minimum))
+        last = datetime.date.fromisoformat(str(maximum))
+    except ValueError:
+        return None
+    days = (last - first).days
+    step = max(int(math.ceil((days + 1) / float(partitions))), 1)
+    edges = [first + datetime.timedelta(days=day) for day in range(0, days, step)]
+    return [edge.isoformat() for edge in (edges or [first]) + [last]]
+
+
+def _timed(fetch, api_call, params):
+    start = time.time()
+    result = fetch(api_call, params)
+    return result, time.time() - start
+
+
+def _query(api_call, api_key, params, transport=None):
+    # the whole page is built anyway, so it is decoded in one go, a page that fails part
+    # way is retried on its own
+    return get_response(
+        _encode(api_call, params), api_key, transport=transport, parse=read_page
+    )
+
+
+def _fetch_in_process(executor, api_key, transport, api_call, params):
+    # the rate limit, retries and observer of the transport apply here in the parent, the
+    # worker makes a single attempt
+    settings = (transport.timeout, transport.compress)
+    url = _encode(api_call, params)
+    attempt = 0
+    while True:
+        if transport.rate_limiter is not None:
+            transport.rate_limiter.acquire()
+        future = executor.submit(_decode_page, url, api_key, settings)
+        page, requests, error = future.result()
+        if transport.observer is not None:
+            for stats in requests:
+                stats.retries = attempt
+                transport.observer.on_request(stats)
+        if error is None:
+            return page
+        attempt += 1
+        wait_to_retry(transport, error, attempt)
+
+
+# the transport of a worker process, opened by the first page it fetches
+_process_transport = None
+
+
+def _decode_page(url, api_key, settings):
+    # runs in a worker process, the records are sent back as column arrays along with the
+    # stats of the request and the error it failed with
+    global _process_transport
+    if _process_transport is None:
+        timeout, compress = settings
+        _process_transport = Transport(
+            pool_size=1,
+            timeout=timeout,
+            compress=compress,
+            retry=RetryPolicy(total=0),
+            observer=_RequestLog(),
+        )
+    requests = _process_transport.observer
+    del requests[:]
+    try:
+        page = get_response(url, api_key, transport=_process_transport, parse=read_page)
+    except RdsError as error:
+        return None, list(requests), error
+    page["records"] = CompactRecords(page["records"])
+    return page, list(requests), None
+
 
-        api_call += urllib.parse.urlencode(params)
-    else:
-        import urllib
+class _RequestLog(list):
+    # keeps the stats of a worker's requests to send them back with the page
+    def on_request(self, stats):
+        self.append(stats)
 
-        api_call += urllib.urlencode(params)
 
-    response = get_response(api_call, api_key)
-    return json.load(response)
+def _encode(api_call, params):
+    return api_call + urlencode(params)
 
 
 def _get_rds_results(results, metadata_json, count):
@@ -453,15 +1488,76 @@ def _get_rds_results(results, metadata_json, count):
             col_names.append(var_name)
         metadata = list(metadata_json.values())
 
-    records = []
+    # a view over the record lists of the pages, no record is copied
+    records = ChainedRecords()
     totals = None
     for result in results:
-        for record in result["records"]:
-            records.append(record)
+        records.append(result["records"])
         if result["totals"] != None and result["totals"] != []:
             if totals == None:
-                totals = []
-            for total in result["totals"]:
-                totals.append(total)
+                totals = ChainedRecords()
+            totals.append(result["totals"])
 
     return RdsResults(records, col_names, metadata, totals, count)
+
+
+def _get_compact_results(results, metadata, count, records=None):
+    # stores each page in typed columns as it arrives instead of keeping its records
+    metadata_json = {} if metadata else None
+    if records is None:
+        records = CompactRecords()
+    totals = []
+    count_value = None
+    for result in results:
+        if count and count_value is None:
+            count_value = result["info"]["rowCount"]
+        if metadata:
+            metadata_json.update(_get_metadata([result]))
+        records.append(result["records"])
+        if result["totals"]:
+            totals.extend(result["totals"])
+
+    results = _get_rds_results([], metadata_json, count_value)
+    results.records = records
+    results.totals = totals or None
+    return results
+
+
+def _get_spilled_results(results, metadata, count, directory):
+    # writes each page to disk as it arrives and maps the files once the query completes
+    store = SpillStore(directory)
+    try:
+        results = _get_compact_results(results, metadata, count, store)
+    except BaseException:
+        store.remove()
+        raise
+    results.records = store.open()
+    return results
+
+
+def _get_columnar_results(results, metadata, count):
+    # converts each page into column chunks as it arrives instead of keeping its records
+    metadata_json = {} if metadata else None
+    builder = None
+    count_value = None
+    for result in results:
+        if count and count_value is None:
+            count_value = result["info"]["rowCount"]
+        if metadata:
+            metadata_json.update(_get_metadata([result]))
+        if builder is None and (metadata_json or result["records"]):
+            # every column is typed from its metadata, even when no record matched
+            if metadata_json:
+                builder = ColumnBuilder(
+                    list(metadata_json.keys()), list(metadata_json.values())
+                )
+            else:
+                builder = ColumnBuilder(list(range(len(result["records"][0]))))
+        if builder is not None:
+            builder.append(result["records"])
+
+    arrays = builder.build() if builder is not None else {}
+    results = _get_rds_results([], metadata_json, count_value)
+    results.records = None
+    results.arrays = arrays
+    return results
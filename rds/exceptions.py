@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Errors raised when a request to an RDS server fails
+"""
+
+
+class RdsError(Exception):
+    """The base class of every error raised while talking to an RDS server."""
+
+    def __init__(self, message, url=None):
+        Exception.__init__(self, message)
+        self.url = url
+
+    def __reduce__(self):
+        # lets errors raised in worker processes be sent back to the caller
+        return self.__class__, (self.args[0], self.url)
+
+
+class RdsHTTPError(RdsError):
+    """
+    The server answered with an error status.
+
+    Attributes
+    ----------
+    status : int
+        The HTTP status code.
+    reason : str
+        The reason phrase sent with the status.
+    retry_after : float
+        Seconds the server asked to wait before trying again, or None.
+    """
+
+    def __init__(self, status, reason, url, message="", retry_after=None):
+        text = "HTTP Error " + str(status) + ": " + str(reason) + " [" + str(url) + "]"
+        if message:
+            text += " " + message
+        RdsError.__init__(self, text, url)
+        self.status = status
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        return self.__class__, (
+            self.status,
+            self.reason,
+            self.url,
+            self.message,
+            self.retry_after,
+        )
+
+
+class RdsConnectionError(RdsError):
+    """The connection failed, timed out or was dropped before the response was read."""
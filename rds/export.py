@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Writes query pages to CSV or Parquet files as they arrive, so results larger than memory can
+be saved. Parquet files need the optional NumPy and pyarrow dependencies.
+"""
+
+import csv
+import threading
+
+from queue import Full, Queue
+
+from .columnar import _require
+
+# the number of pages fetched ahead of the writer
+_PREFETCH = 2
+
+
+def export_pages(pages, path, format="csv"):
+    """
+    Writes pages of results to a file. The next pages are fetched on a background thread
+    while the current one is written.
+
+    Parameters
+    ----------
+    pages : iterable of RdsResults
+        The pages to write, in order.
+    path : str
+        The file to write.
+    format : str, optional
+        Either csv or parquet. Parquet files get one row group per page. The default is csv.
+
+    Returns
+    -------
+    int
+        The number of records written.
+    """
+    if format not in _WRITERS:
+        raise ValueError(
+            "Unknown export format [" + str(format) + "], expected csv or parquet."
+        )
+
+    writer = _WRITERS[format](path)
+    count = 0
+    try:
+        for page in _prefetch(pages):
+            writer.write(page)
+            count += len(page.records)
+    finally:
+        writer.close()
+    return count
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._header = False
+
+    def write(self, page):
+        if not self._header:
+            self._header = True
+            if page.columns is not None:
+                self._writer.writerow(page.columns)
+        self._writer.writerows(page.records)
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path):
+        self._pa = _require("pyarrow")
+        import pyarrow.parquet
+
+        self._parquet = pyarrow.parquet
+        self._path = path
+        self._schema = None
+        self._writer = None
+
+    def write(self, page):
+        table = page.to_arrow()
+        if self._writer is None:
+            # columns that only held nulls so far are written as strings
+            self._schema = self._pa.schema(
+                [
+                    (
+                        field.with_type(self._pa.string())
+                        if self._pa.types.is_null(field.type)
+                        else field
+                    )
+                    for field in table.schema
+                ]
+            )
+            self._writer = self._parquet.ParquetWriter(self._path, self._schema)
+        self._writer.write_table(table.cast(self._schema))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+def _prefetch(pages):
+    # pages are fetched on a background thread, at most a few ahead of the consumer
+    queue = Queue(_PREFETCH)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(pages)
+        try:
+            for page in iterator:
+                if not put((page, None)):
+                    return
+            put((done, None))
+        except Exception as e:
+            put((done, e))
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            page, error = queue.get()
+            if page is done:
+                if error is not None:
+                    raise error
+                return
+            yield page
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sizes the pages of a query from how the previous pages performed
+"""
+
+import math
+
+from .stream import StreamedPage
+
+# the largest number of cells RDS returns in a single page
+_MAX_CELLS = 10000
+
+
+class PageSizer:
+    """
+    Picks the number of records requested by each page of a query. Pages are as large as the
+    server allows by default. When a target time or size is set, each page is sized from the
+    rate and the bytes per record measured on the previous page, so pages grow on fast links
+    and shrink on slow ones while staying within the server's cell limit.
+
+    Parameters
+    ----------
+    max_cells : int, optional
+        The largest number of cells the server returns in a single page. The default is 10000.
+    max_rows : int, optional
+        The largest number of records requested in a single page. The default is None which
+        is only bound by max_cells.
+    target_time : float, optional
+        Seconds each page should take to arrive. The default is None which does not size
+        pages by time.
+    max_bytes : int, optional
+        The largest decoded page body in bytes. The default is None which does not size pages
+        by their payload.
+    """
+
+    def __init__(
+        self, max_cells=_MAX_CELLS, max_rows=None, target_time=None, max_bytes=None
+    ):
+        self.max_cells = max_cells
+        self.max_rows = max_rows
+        self.target_time = target_time
+        self.max_bytes = max_bytes
+
+    def get_ceiling(self, width):
+        """Returns the largest number of records a page of ``width`` columns may hold."""
+        ceiling = max(math.floor(self.max_cells / max(width, 1)), 1)
+        if self.max_rows is not None:
+            ceiling = min(ceiling, self.max_rows)
+        return ceiling
+
+    def next_limit(self, page, limit, elapsed=None):
+        """
+        Parameters
+        ----------
+        page : JSON or StreamedPage
+            The page that was just received.
+        limit : int
+            The number of records the page was requested with.
+        elapsed : float, optional
+            Seconds the page took to arrive. The default is None.
+
+        Returns
+        -------
+        limit : int
+            The number of records to request with the following page.
+        """
+        if isinstance(page, StreamedPage):
+            width, count = page.width, page.count
+        else:
+            records = page["records"]
+            width, count = (len(records[0]) if records else None), len(records)
+        if not width:
+            return limit
+
+        next_limit = self.get_ceiling(width)
+        if self.target_time and elapsed:
+            next_limit = min(next_limit, count * self.target_time / elapsed)
+        size = getattr(page, "size", None)
+        if self.max_bytes and size:
+            next_limit = min(next_limit, count * self.max_bytes / size)
+        return max(int(next_limit), 1)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sequences holding the records of a query. ChainedRecords presents the record lists of the
+pages as one sequence without copying them, CompactRecords keeps the records one typed column
+at a time in arrays from the standard library, with the strings of each column stored once,
+and only turns them back into lists when they are read.
+"""
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import chain
+
+# the array typecode and the placeholder stored for nulls of each compact column kind
+_KIND_ARRAYS = {
+    "int": ("q", 0),
+    "float": ("d", 0.0),
+    "code": ("i", 0),
+}
+
+
+class ChainedRecords(Sequence):
+    """
+    A read-only view of the record lists of several pages as one sequence. Assembling the
+    results of a query only keeps a reference to each page, so no record is copied. Indexing,
+    slicing, iteration, ``len`` and comparison with a list of records behave like a list.
+
+    Parameters
+    ----------
+    pages : iterable of list, optional
+        The record lists of the pages, in order. The default is none.
+    """
+
+    def __init__(self, pages=()):
+        self._pages = []
+        self._ends = []
+        for page in pages:
+            self.append(page)
+
+    def append(self, records):
+        """Adds the record list of the next page to the end of the view."""
+        if records:
+            self._pages.append(records)
+            self._ends.append(len(self) + len(records))
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            records = []
+            while start < stop:
+                page = bisect_right(self._ends, start)
+                offset = start - (self._ends[page - 1] if page else 0)
+                end = min(stop, self._ends[page])
+                records.extend(self._pages[page][offset : offset + end - start])
+                start = end
+            return records
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("record index out of range")
+        page = bisect_right(self._ends, index)
+        return self._pages[page][index - (self._ends[page - 1] if page else 0)]
+
+    def __iter__(self):
+        return chain.from_iterable(self._pages)
+
+    def __eq__(self, other):
+        return _equal_records(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "ChainedRecords(%d records, %d pages)" % (len(self), len(self._pages))
+
+
+class CompactRecords(Sequence):
+    """
+    A sequence of records stored as typed columns. Integer and decimal columns are held in
+    arrays, string columns as indexes into the distinct strings of the column, and any other
+    column as a plain list. Reading a record builds it as a list, so ``records[i]``,
+    ``len(records)``, slicing, iteration and comparison with a list of records behave like
+    the list of records returned by a query.
+
+    Records are added a page at a time with ``append`` so that each page can be released as
+    soon as it is stored.
+    """
+
+    def __init__(self, records=None):
+        self._columns = None
+        self._length = 0
+        if records is not None:
+            self.append(records)
+
+    @property
+    def width(self):
+        """The number of columns, or None when no records were added."""
+        return len(self._columns) if self._columns is not None else None
+
+    def append(self, records):
+        """
+        Stores a page of records, all of the same width. The columns of another
+        CompactRecords are copied over as arrays without building its records.
+        """
+        if not records:
+            return
+        if isinstance(records, CompactRecords):
+            if self._columns is None:
+                self._columns = [_Column() for _ in records._columns]
+            for column, other in zip(self._columns, records._columns):
+                column.merge(other, self._length, len(records))
+        else:
+            if self._columns is None:
+                self._columns = [_Column() for _ in records[0]]
+            for column, values in zip(self._columns, zip(*records)):
+                column.extend(values, self._length)
+        self._length += len(records)
+
+    def map_column(self, index, mapping):
+        """
+        Replaces the values of a column that are keys of a mapping with their mapped values.
+        String columns are mapped once per distinct string.
+        """
+        column = self._columns[index] if self._columns is not None else None
+        if column is None:
+            return
+        if column.kind == "code":
+            column.labels = [mapping.get(label, label) for label in column.labels]
+            column.codes = {label: code for code, label in enumerate(column.labels)}
+            return
+        values = tuple(
+            None if value is None else mapping.get(value, value)
+            for value in column.iter()
+        )
+        self._columns[index] = _Column()
+        self._columns[index].extend(values, 0)
+
+    def column(self, index):
+        """Returns the values of a column as a list."""
+        if self._columns is None:
+            return []
+        return list(self._columns[index].iter())
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("record index out of range")
+        return self._record(index)
+
+    def __iter__(self):
+        if self._columns is None:
+            return iter(())
+        columns = [column.iter() for column in self._columns]
+        return map(list, zip(*columns))
+
+    def __eq__(self, other):
+        return _equal_records(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "CompactRecords(%d records, %s columns)" % (self._length, self.width)
+
+    def _record(self, index):
+        return [column.get(index) for column in self._columns]
+
+
+class _Column:
+    # the values of one column, kept in an array while they all share a compact kind
+    __slots__ = ("kind", "values", "nulls", "labels", "codes")
+
+    def __init__(self):
+        self.kind = None
+        self.values = []
+        self.nulls = None
+        self.labels = None
+        self.codes = None
+
+    def extend(self, values, length):
+        kind = _get_kind(values)
+        if self.kind is None and kind is not None:
+            self._convert(kind, length)
+        elif kind is not None and kind != self.kind:
+            self._convert("object", length)
+
+        if self.kind in _KIND_ARRAYS:
+            null = _KIND_ARRAYS[self.kind][1]
+            try:
+                self.values.extend(self._encode(values, null))
+            except OverflowError:
+                # integers too large for 64 bits
+                self._convert("object", length)
+        if self.kind not in _KIND_ARRAYS:
+            self.values.extend(values)
+            return
+
+        if self.nulls is None and None in values:
+            self.nulls = bytearray(length)
+        if self.nulls is not None:
+            self.nulls.extend(value is None for value in values)
+
+    def merge(self, other, length, other_length):
+        if other.kind not in _KIND_ARRAYS or self.kind not in (None, other.kind):
+            self.extend(tuple(other.iter()), length)
+            return
+        if self.kind is None:
+            self._convert(other.kind, length)
+
+        values = other.values
+        if self.kind == "code":
+            # the other column numbers its strings on its own
+            indexes = [self._code(label) for label in other.labels]
+            values = array("i", map(indexes.__getitem__, values))
+        self.values.extend(values)
+
+        if other.nulls is not None:
+            if self.nulls is None:
+                self.nulls = bytearray(length)
+            self.nulls.extend(other.nulls)
+        elif self.nulls is not None:
+            self.nulls.extend(bytearray(other_length))
+
+    def get(self, index):
+        if self.nulls is not None and self.nulls[index]:
+            return None
+        value = self.values[index]
+        return self.labels[value] if self.kind == "code" else value
+
+    def iter(self):
+        if self.kind not in _KIND_ARRAYS:
+            return iter(self.values)
+        values = self.values
+        if self.kind == "code":
+            values = map(self.labels.__getitem__, values)
+        if self.nulls is None:
+            return iter(values)
+        return (None if null else value for value, null in zip(values, self.nulls))
+
+    def _encode(self, values, null):
+        if self.kind != "code":
+            return array(
+                self.values.typecode, [null if v is None else v for v in values]
+            )
+        codes = self.codes
+        indexes = array("i")
+        for value in values:
+            if value is None:
+                indexes.append(null)
+                continue
+            index = codes.get(value)
+            if index is None:
+                index = self._code(value)
+            indexes.append(index)
+        return indexes
+
+    def _code(self, value):
+        index = self.codes.get(value)
+        if index is None:
+            index = self.codes[value] = len(self.labels)
+            self.labels.append(value)
+        return index
+
+    def _convert(self, kind, length):
+        previous = list(self.iter()) if self.kind is not None else None
+        self.kind = kind
+        self.nulls = None
+        self.labels = None
+        self.codes = None
+        if kind in _KIND_ARRAYS:
+            # only reached before any value was stored, the earlier records were nulls
+            typecode, null = _KIND_ARRAYS[kind]
+            self.values = array(typecode, [null]) * length
+            if kind == "code":
+                self.labels = []
+                self.codes = {}
+            if length:
+                self.nulls = bytearray(b"\x01") * length
+        else:
+            self.values = previous if previous is not None else [None] * length
+
+
+def _equal_records(records, other):
+    if not isinstance(other, (Sequence, list, tuple)) or isinstance(other, str):
+        return NotImplemented
+    if len(records) != len(other):
+        return False
+    return all(mine == list(theirs) for mine, theirs in zip(records, other))
+
+
+def _get_kind(values):
+    # the compact kind every value of a page fits, None when they are all null
+    kind = None
+    for value in values:
+        if value is None:
+            continue
+        value_type = type(value)
+        if value_type is int:
+            value_kind = "int"
+        elif value_type is float:
+            value_kind = "float"
+        elif value_type is str:
+            value_kind = "code"
+        else:
+            return "object"
+        if kind is None:
+            kind = value_kind
+        elif kind != value_kind:
+            return "object"
+    return kind
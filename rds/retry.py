@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retry and rate limiting policies shared by the transports
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+from .exceptions import RdsConnectionError, RdsHTTPError
+
+
+class RetryPolicy:
+    """
+    Decides whether a failed request is tried again and how long to wait first. Waits grow
+    exponentially with each attempt, and a ``Retry-After`` header sent by the server is
+    honored when it asks for longer.
+
+    Parameters
+    ----------
+    total : int, optional
+        The number of times a request is retried before its error is raised. The default
+        is 3.
+    backoff_factor : float, optional
+        Seconds waited before the first retry, doubling on every following one. The default
+        is 0.5.
+    max_backoff : float, optional
+        The longest wait in seconds, including waits asked for by the server. The default
+        is 30.
+    statuses : tuple of int, optional
+        The HTTP statuses that are retried. The default is 429, 502, 503 and 504.
+    jitter : bool, optional
+        flag for randomizing each wait between half and all of its length, so that clients
+        failing together do not retry together. The default is True.
+    """
+
+    def __init__(
+        self,
+        total=3,
+        backoff_factor=0.5,
+        max_backoff=30,
+        statuses=(429, 502, 503, 504),
+        jitter=True,
+    ):
+        self.total = total
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = tuple(statuses)
+        self.jitter = jitter
+
+    def get_delay(self, error, attempt):
+        """
+        Parameters
+        ----------
+        error : RdsError
+            The error the request failed with.
+        attempt : int
+            The number of the retry about to be made, starting at 1.
+
+        Returns
+        -------
+        delay : float
+            Seconds to wait before retrying, or None if the request should not be retried.
+        """
+        if attempt > self.total:
+            return None
+        if isinstance(error, RdsHTTPError):
+            if error.status not in self.statuses:
+                return None
+        elif not isinstance(error, RdsConnectionError):
+            return None
+
+        delay = self.backoff_factor * (2 ** (attempt - 1))
+        if self.jitter:
+            delay *= random.uniform(0.5, 1.0)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return min(delay, self.max_backoff)
+
+
+class RateLimiter:
+    """
+    A token bucket limiting how many requests are sent per second. It is thread safe, so a
+    single limiter can be shared by every transport talking to the same server.
+
+    Parameters
+    ----------
+    rate : float
+        The number of requests allowed per second on average.
+    burst : int, optional
+        The number of requests that can be sent at once after a quiet period. The default is
+        None which allows a single request.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Takes a token, borrowing it from the future when the bucket is empty.
+
+        Returns
+        -------
+        delay : float
+            Seconds to wait before the request may be sent.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def parse_retry_after(value):
+    """Converts a ``Retry-After`` header, in seconds or as an HTTP date, into seconds."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return max(date.timestamp() - time.time(), 0.0)
@@ -6,8 +6,11 @@ Contains server properties and hosts catalogs and dataproducts
 
 import json
 
+from concurrent.futures import ThreadPoolExecutor
+
 from .catalog import Catalog
-from .utility import get_response
+from .transport import Transport
+from .utility import get_json
 
 
 #TODO pass api key to util methods
@@ -25,9 +28,34 @@ class Server:
         The RDS path, defaults to /rds
     port: str, optional
         The port, defaults to None
+    api_key: str, optional
+        The API key sent with every request, defaults to None
+    transport: Transport, optional
+        The pooled HTTP transport shared by every catalog and data product of this server,
+        defaults to a new Transport
+    cache: ResultCache, optional
+        The on-disk cache answering repeated select and tabulate queries, defaults to None
+    metadata_cache: MetadataCache, optional
+        The in-memory cache answering repeated metadata lookups of this server, its catalogs
+        and data products, defaults to None
+    observer: StatsCollector, optional
+        Receives the timings of every request and query made through this server, attached
+        to its transport. Any object with ``on_request`` and ``on_query`` methods can be
+        used, defaults to None
     """
 
-    def __init__(self, domain, protocol="https", path="/rds", port=None, api_key=None):
+    def __init__(
+        self,
+        domain,
+        protocol="https",
+        path="/rds",
+        port=None,
+        api_key=None,
+        transport=None,
+        cache=None,
+        metadata_cache=None,
+        observer=None,
+    ):
         api = domain
         if "http" not in domain:
             api = protocol + "://" + api
@@ -39,8 +67,13 @@ class Server:
 
         self.api = api
         self.api_key = api_key
+        self.transport = transport if transport is not None else Transport()
+        if observer is not None:
+            self.transport.observer = observer
+        self.cache = cache
+        self.metadata_cache = metadata_cache
 
-    def get_catalog(self, catalog_id):
+    def get_catalog(self, catalog_id, lazy=False):
         """
         Gets a catalog.
         
@@ -48,13 +81,80 @@ class Server:
         ----------
         catalog_id : string
             ID of the catalog you want.
+        lazy : bool, optional
+            flag for deferring the metadata lookups of the catalog and its data products
+            until their properties are first accessed. The default is False.
     
         Returns
         -------
         Catalog
             An object that contains data products and catalog properties.
         """
-        return Catalog(self.api, self.api_key, catalog_id)
+        return Catalog(
+            self.api,
+            self.api_key,
+            catalog_id,
+            transport=self.transport,
+            lazy=lazy,
+            cache=self.cache,
+            metadata_cache=self.metadata_cache,
+        )
+
+    def run_many(self, queries, max_workers=4, return_exceptions=False):
+        """
+        Runs independent queries concurrently, across any catalogs and data products of this
+        server. Identical queries are only run once.
+
+        Parameters
+        ----------
+        queries : list of dict
+            The queries to run. Each one names its ``catalog`` and ``dataproduct``, the
+            ``query`` method to call, one of select, tabulate or count with select as the
+            default, and the keyword arguments of that method as ``params``. For example
+            ``{"catalog": "census", "dataproduct": "acs", "query": "tabulate",
+            "params": {"dims": ["sex"]}}``.
+        max_workers : int, optional
+            The number of queries run at the same time. The default is 4.
+        return_exceptions : bool, optional
+            flag for returning the error of a failed query in its place instead of raising
+            it. The default is False.
+
+        Returns
+        -------
+        results : list
+            The result of each query in the order they were given. Duplicated queries share
+            the same result object.
+        """
+        keys = [_query_key(query) for query in queries]
+        unique = list(dict.fromkeys(keys))
+        specs = dict(zip(keys, queries))
+        dataproducts = {}
+        for catalog_id, dataproduct_id, _, _ in unique:
+            if (catalog_id, dataproduct_id) not in dataproducts:
+                catalog = self.get_catalog(catalog_id, lazy=True)
+                dataproducts[catalog_id, dataproduct_id] = catalog.get_dataproduct(
+                    dataproduct_id
+                )
+
+        def run(key):
+            spec = specs[key]
+            dataproduct = dataproducts[key[0], key[1]]
+            method = getattr(dataproduct, key[2])
+            try:
+                return method(**spec.get("params", {}))
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                return error
+
+        if max_workers is None or max_workers <= 1 or len(unique) <= 1:
+            outcomes = [run(key) for key in unique]
+        else:
+            workers = min(max_workers, len(unique))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(run, unique))
+        results = dict(zip(unique, outcomes))
+        return [results[key] for key in keys]
 
     def get_root_catalog(self):
         """
@@ -65,7 +165,10 @@ class Server:
         JSON
             The root catalog.
         """
-        return json.load(get_response(self.api + "/api/catalog", self.api_key))
+        api_call = self.api + "/api/catalog"
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "root_catalog"
+        )
 
     def get_changelog(self):
         """
@@ -77,7 +180,10 @@ class Server:
             The changelog.
 
         """
-        return json.load(get_response(self.api + "/api/server/info", self.api_key))
+        api_call = self.api + "/api/server/info"
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "changelog"
+        )
 
     def get_info(self):
         """
@@ -89,4 +195,19 @@ class Server:
             Server information.
 
         """
-        return json.load(get_response(self.api + "/api/server/changelog", self.api_key))
+        api_call = self.api + "/api/server/changelog"
+        return get_json(
+            api_call, self.api_key, self.transport, self.metadata_cache, "info"
+        )
+
+
+_QUERY_METHODS = ("select", "tabulate", "count")
+
+
+def _query_key(query):
+    method = query.get("query", "select")
+    if method not in _QUERY_METHODS:
+        expected = ", ".join(_QUERY_METHODS)
+        raise ValueError("Unknown query " + repr(method) + ", expected " + expected)
+    params = json.dumps(query.get("params", {}), sort_keys=True, default=repr)
+    return query["catalog"], query["dataproduct"], method, params
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spills query records to disk one column per file as the pages arrive, and reads them back
+through memory maps so that results larger than memory are paged in and out by the operating
+system instead of being held by the process.
+"""
+
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+
+from array import array
+from collections.abc import Sequence
+
+from .records import _equal_records, _get_kind
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# the array typecode of the columns stored with a fixed width
+_FIXED_KINDS = {"int": "q", "float": "d"}
+_CONVERT_ROWS = 65536
+
+
+class SpillStore:
+    """
+    Writes pages of records to a new directory, one set of files per column. Integer and
+    decimal columns are stored as 8 byte values, strings as UTF-8 text with the offset where
+    each value ends, and any other column as JSON text in the same way. Every column also has
+    a file flagging its nulls.
+
+    Parameters
+    ----------
+    directory : str, optional
+        The directory the records are spilled under. The default is None which uses the
+        system's temporary directory.
+    """
+
+    def __init__(self, directory=None):
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="rds-spill-", dir=directory)
+        self._writers = None
+        self._length = 0
+
+    def append(self, records):
+        """Writes a page of records, all of the same width, to the end of the columns."""
+        if not records:
+            return
+        if hasattr(records, "column"):
+            width = records.width
+            columns = [records.column(index) for index in range(width)]
+        else:
+            width = len(records[0])
+            columns = zip(*records)
+        if self._writers is None:
+            self._writers = [
+                _ColumnWriter(os.path.join(self.path, str(index)))
+                for index in range(width)
+            ]
+        for writer, values in zip(self._writers, columns):
+            writer.write(tuple(values), self._length)
+        self._length += len(records)
+
+    def open(self):
+        """
+        Finishes writing and maps the files.
+
+        Returns
+        -------
+        records : SpilledRecords
+            The records read back through memory maps.
+        """
+        columns = [writer.close(self._length) for writer in self._writers or []]
+        return SpilledRecords(self.path, columns, self._length)
+
+    def remove(self):
+        """Deletes the spilled files."""
+        for writer in self._writers or []:
+            for f in (writer._files or {}).values():
+                f.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class SpilledRecords(Sequence):
+    """
+    Records spilled to disk by a SpillStore and read back through memory maps. Reading a
+    record builds it as a list, so ``records[i]``, ``len(records)``, slicing, iteration and
+    comparison with a list of records behave like the list of records returned by a query,
+    while only the parts of the files being read are in memory. The files are deleted by
+    ``close`` or once the records are garbage collected.
+    """
+
+    def __init__(self, path, columns, length):
+        self.path = path
+        self._columns = columns
+        self._length = length
+        self._finalizer = weakref.finalize(self, shutil.rmtree, path, True)
+
+    @property
+    def width(self):
+        """The number of columns, or None when no records were spilled."""
+        return len(self._columns) if self._columns else None
+
+    def column(self, index):
+        """
+        Returns
+        -------
+        column : SpilledColumn
+            The values of a column, read from its memory mapped files.
+        """
+        return self._columns[index]
+
+    def to_numpy(self, names=None):
+        """
+        Gets every column as a NumPy array, see ``SpilledColumn.to_numpy``. Requires NumPy.
+
+        Parameters
+        ----------
+        names : list of str, optional
+            The keys of the columns. The default is None which keys them by position.
+
+        Returns
+        -------
+        arrays : dict
+            The column names mapped to their arrays.
+        """
+        if names is None:
+            names = list(range(len(self._columns)))
+        return {name: column.to_numpy() for name, column in zip(names, self._columns)}
+
+    def close(self):
+        """Unmaps the files and deletes them."""
+        for column in self._columns:
+            column.close()
+        self._finalizer()
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            columns = [column[index] for column in self._columns]
+            return [list(record) for record in zip(*columns)]
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("record index out of range")
+        return [column[index] for column in self._columns]
+
+    def __iter__(self):
+        return map(list, zip(*self._columns))
+
+    def __eq__(self, other):
+        return _equal_records(self, other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "SpilledRecords(%d records, %s columns, %r)" % (
+            self._length,
+            self.width,
+            self.path,
+        )
+
+
+class SpilledColumn(Sequence):
+    """
+    The values of a spilled column, read from its memory mapped files.
+
+    Attributes
+    ----------
+    kind : str
+        How the values are stored, one of int, float, str or json.
+    """
+
+    def __init__(self, path, kind, length):
+        self.path = path
+        self.kind = kind
+        self._length = length
+        self._maps = []
+        self._nulls = self._map(".nulls")
+        if kind in _FIXED_KINDS:
+            self._values = self._map(".values").cast(_FIXED_KINDS[kind])
+        else:
+            self._offsets = self._map(".offsets").cast("q")
+            self._data = self._map(".data")
+
+    def to_numpy(self):
+        """
+        Gets the column as a NumPy array. Integer and decimal columns are views of the memory
+        mapped file, masked where they hold nulls, so they are not read into memory. String
+        and other columns are read into memory as an array of objects. Requires NumPy.
+
+        Returns
+        -------
+        values : numpy.ndarray
+            The values of the column.
+        """
+        if np is None:
+            raise ImportError(
+                "NumPy is required for NumPy arrays, install it with: pip install numpy"
+            )
+        if self.kind not in _FIXED_KINDS:
+            return np.array(list(self), dtype=object)
+        values = np.frombuffer(self._values, dtype=_FIXED_KINDS[self.kind])
+        if not self._has_nulls():
+            return values
+        nulls = np.frombuffer(self._nulls, dtype=bool)
+        return np.ma.masked_array(values, mask=nulls, copy=False)
+
+    def close(self):
+        """Unmaps the files of the column."""
+        self._nulls = self._values = self._offsets = self._data = None
+        for view, mapped in self._maps:
+            try:
+                view.release()
+                mapped.close()
+            except BufferError:
+                # arrays handed out by to_numpy still point into the map, which is
+                # unmapped once they are garbage collected
+                pass
+        self._maps = []
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("column index out of range")
+        return self._get(index)
+
+    def __iter__(self):
+        return map(self._get, range(self._length))
+
+    def _get(self, index):
+        if self._nulls[index]:
+            return None
+        if self.kind in _FIXED_KINDS:
+            return self._values[index]
+        start = self._offsets[index - 1] if index else 0
+        text = self._data[start : self._offsets[index]].tobytes().decode("utf-8")
+        return text if self.kind == "str" else json.loads(text)
+
+    def _has_nulls(self):
+        # the nulls file is mapped first, and is only empty when the column is
+        if not self._length:
+            return False
+        return self._maps[0][1].find(b"\x01") != -1
+
+    def _map(self, suffix):
+        with open(self.path + suffix, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return memoryview(b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        self._maps.append((view, mapped))
+        return view
+
+
+class _ColumnWriter:
+    # appends the values of one column to its files, in the layout SpilledColumn reads
+    def __init__(self, path):
+        self.path = path
+        self.kind = None
+        self._files = None
+        self._end = 0
+
+    def write(self, values, length):
+        kind = _get_kind(values)
+        kind = {"code": "str", "object": "json"}.get(kind, kind)
+        if self.kind is None and kind is not None:
+            self._start(kind, length)
+        elif kind is not None and self.kind not in (kind, "json"):
+            self._convert(length)
+
+        if self.kind in _FIXED_KINDS:
+            try:
+                encoded = array(
+                    _FIXED_KINDS[self.kind], [0 if v is None else v for v in values]
+                )
+            except OverflowError:
+                # integers too large for 8 bytes
+                self._convert(length)
+        if self.kind is None:
+            return
+        self._files["nulls"].write(bytes(bytearray(v is None for v in values)))
+        if self.kind in _FIXED_KINDS:
+            encoded.tofile(self._files["values"])
+        else:
+            self._write_text(values)
+
+    def close(self, length):
+        if self._files is None:
+            # a column holding only nulls
+            self._start("json", length)
+        for f in self._files.values():
+            f.close()
+        return SpilledColumn(self.path, self.kind, length)
+
+    def _start(self, kind, length):
+        # the records written before the column's kind was known were all null
+        self.kind = kind
+        names = (
+            ("nulls", "values")
+            if kind in _FIXED_KINDS
+            else ("nulls", "offsets", "data")
+        )
+        self._files = {name: open(self.path + "." + name, "wb") for name in names}
+        self._files["nulls"].write(b"\x01" * length)
+        if kind in _FIXED_KINDS:
+            self._files["values"].write(b"\x00" * 8 * length)
+        else:
+            (array("q", [0]) * length).tofile(self._files["offsets"])
+
+    def _write_text(self, values):
+        offsets = array("q")
+        chunks = []
+        for value in values:
+            if value is not None:
+                if self.kind == "json":
+                    value = json.dumps(value)
+                chunk = value.encode("utf-8")
+                chunks.append(chunk)
+                self._end += len(chunk)
+            offsets.append(self._end)
+        offsets.tofile(self._files["offsets"])
+        self._files["data"].write(b"".join(chunks))
+
+    def _convert(self, length):
+        # rewrites the column as JSON once it holds values of different kinds
+        for f in self._files.values():
+            f.close()
+        previous = SpilledColumn(self.path, self.kind, length)
+        converted = _ColumnWriter(self.path + "j")
+        converted._start("json", 0)
+        for start in range(0, length, _CONVERT_ROWS):
+            values = previous[start : start + _CONVERT_ROWS]
+            converted._files["nulls"].write(bytes(bytearray(v is None for v in values)))
+            converted._write_text(values)
+        previous.close()
+        for name in ("nulls", "values", "offsets", "data"):
+            if os.path.exists(self.path + "." + name):
+                os.remove(self.path + "." + name)
+        self.path = converted.path
+        self.kind = converted.kind
+        self._files = converted._files
+        self._end = converted._end
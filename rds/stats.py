@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Timings of requests and queries, reported to an observer attached to a server's transport
+"""
+
+import threading
+import time
+
+from collections import deque
+
+
+class RequestStats:
+    """
+    The timings of a single HTTP request. Times are in seconds and are None when the request
+    did not get that far.
+
+    Attributes
+    ----------
+    url : str
+        The requested url.
+    status : int
+        The HTTP status of the response.
+    bytes : int
+        The number of body bytes received, before decompression.
+    connect_time : float
+        Time spent opening a new connection, covering DNS, TCP and TLS. Zero when a pooled
+        connection was reused.
+    first_byte_time : float
+        Time from sending the request until the response headers arrived, mostly the time the
+        server took to compute the response.
+    total_time : float
+        Time from sending the request until the body was read to the end.
+    read_time : float
+        Time spent reading and decompressing the body.
+    parse_time : float
+        Time spent decoding JSON, not counting the time spent waiting for the body.
+    retries : int
+        The number of failed attempts made before this one.
+    error : str
+        The reason the request failed, or None.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.status = None
+        self.bytes = 0
+        self.connect_time = 0.0
+        self.first_byte_time = None
+        self.total_time = None
+        self.read_time = 0.0
+        self.parse_time = None
+        self.retries = 0
+        self.error = None
+        self.start = time.perf_counter()
+
+    def to_dict(self):
+        """Returns the timings as a dict, ready to be sent to a metrics system."""
+        return {
+            "url": self.url,
+            "status": self.status,
+            "bytes": self.bytes,
+            "connect_time": self.connect_time,
+            "first_byte_time": self.first_byte_time,
+            "total_time": self.total_time,
+            "read_time": self.read_time,
+            "parse_time": self.parse_time,
+            "retries": self.retries,
+            "error": self.error,
+        }
+
+
+class QueryStats:
+    """
+    The totals of a select or tabulate query made of one or more page requests.
+
+    Attributes
+    ----------
+    kind : str
+        Either select or tabulate.
+    url : str
+        The query url without its limit and offset.
+    pages : int
+        The number of pages received.
+    rows : int
+        The number of records received.
+    elapsed : float
+        Seconds from the start of the query until its results were returned.
+    assemble_time : float
+        Seconds spent collecting the pages into the results.
+    """
+
+    def __init__(self, kind, url, pages, rows, elapsed, assemble_time=0.0):
+        self.kind = kind
+        self.url = url
+        self.pages = pages
+        self.rows = rows
+        self.elapsed = elapsed
+        self.assemble_time = assemble_time
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else None
+
+    def to_dict(self):
+        """Returns the totals as a dict, ready to be sent to a metrics system."""
+        return {
+            "kind": self.kind,
+            "url": self.url,
+            "pages": self.pages,
+            "rows": self.rows,
+            "elapsed": self.elapsed,
+            "assemble_time": self.assemble_time,
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+class StatsCollector:
+    """
+    An observer that adds up the timings of every request and query. Any object with
+    ``on_request(stats)`` and ``on_query(stats)`` methods can be used as an observer instead.
+    It is thread safe and only keeps running totals unless a history is asked for.
+
+    Parameters
+    ----------
+    history : int, optional
+        The number of most recent request and query stats kept. The default is 0.
+    callback : function, optional
+        Called with every RequestStats and QueryStats as they are recorded, for example to
+        forward them to a metrics system. The default is None.
+    """
+
+    def __init__(self, history=0, callback=None):
+        self.callback = callback
+        self.requests = deque(maxlen=history)
+        self.queries = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._totals = _empty_totals()
+
+    def on_request(self, stats):
+        with self._lock:
+            totals = self._totals
+            totals["requests"] += 1
+            totals["retries"] += stats.retries
+            totals["bytes"] += stats.bytes
+            totals["connect_time"] += stats.connect_time
+            totals["first_byte_time"] += stats.first_byte_time or 0.0
+            totals["total_time"] += stats.total_time or 0.0
+            totals["parse_time"] += stats.parse_time or 0.0
+            if stats.error is not None:
+                totals["errors"] += 1
+            if self.requests.maxlen:
+                self.requests.append(stats)
+        if self.callback is not None:
+            self.callback(stats)
+
+    def on_query(self, stats):
+        with self._lock:
+            totals = self._totals
+            totals["queries"] += 1
+            totals["pages"] += stats.pages
+            totals["rows"] += stats.rows
+            totals["query_time"] += stats.elapsed
+            totals["assemble_time"] += stats.assemble_time
+            if self.queries.maxlen:
+                self.queries.append(stats)
+        if self.callback is not None:
+            self.callback(stats)
+
+    def snapshot(self):
+        """
+        Returns
+        -------
+        totals : dict
+            The request, retry, error, byte, page, row and query counts along with the time
+            spent in each phase, and the overall rows per second of the queries.
+        """
+        with self._lock:
+            totals = dict(self._totals)
+        totals["rows_per_second"] = (
+            totals["rows"] / totals["query_time"] if totals["query_time"] else None
+        )
+        return totals
+
+    def reset(self):
+        """Clears the totals and the history."""
+        with self._lock:
+            self._totals = _empty_totals()
+            self.requests.clear()
+            self.queries.clear()
+
+
+def _empty_totals():
+    return {
+        "requests": 0,
+        "errors": 0,
+        "retries": 0,
+        "bytes": 0,
+        "connect_time": 0.0,
+        "first_byte_time": 0.0,
+        "total_time": 0.0,
+        "parse_time": 0.0,
+        "queries": 0,
+        "pages": 0,
+        "rows": 0,
+        "query_time": 0.0,
+        "assemble_time": 0.0,
+    }
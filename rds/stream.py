@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parses query pages. Whole pages are decoded at once, while streamed pages decode the records
+array one element at a time as the response body arrives instead of reading the whole body
+first.
+"""
+
+import codecs
+import json
+import time
+
+from .exceptions import RdsConnectionError
+
+_CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+
+def read_page(fp):
+    """
+    Decodes a whole page from a file-like object with the standard library JSON decoder.
+
+    Returns
+    -------
+    page : Page
+        The decoded page.
+    """
+    body = fp.read()
+    page = Page(json.loads(body))
+    page.size = len(body)
+    return page
+
+
+class Page(dict):
+    """A decoded page that also holds the size of its body in bytes."""
+
+    size = None
+
+
+class StreamedPage:
+    """
+    A page whose records are decoded while they are iterated. The other members of the page,
+    like ``info`` and ``totals``, can be read once the records have been iterated.
+
+    Parameters
+    ----------
+    fp : file-like object
+        The response body holding the page.
+    chunk_size : int, optional
+        The number of bytes read at a time. The default is 64 KB.
+    reopen : function, optional
+        Called with the error and the attempt number when the connection drops part way
+        through the page. It returns the page's body requested again, or raises to give up.
+        The default is None which raises the error.
+    """
+
+    def __init__(self, fp, chunk_size=_CHUNK_SIZE, reopen=None):
+        self.width = None
+        self.count = 0
+        self.elapsed = 0.0
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._reopen = reopen
+        self._attempts = 0
+        self._reader = _Reader(fp, chunk_size)
+        self._events = _iter_events(self._reader)
+        self._members = {}
+
+    @property
+    def size(self):
+        """The number of body bytes read so far."""
+        return self._reader.size
+
+    def records(self):
+        """Yields the records of the page as they are decoded."""
+        skip = 0
+        while True:
+            try:
+                while True:
+                    # only the time spent reading counts, not the time spent by the consumer
+                    start = time.time()
+                    event = next(self._events, None)
+                    self.elapsed += time.time() - start
+                    if event is None:
+                        return
+                    name, value = event
+                    if name != "record":
+                        self._members[name] = value
+                    elif skip:
+                        # already yielded before the connection dropped
+                        skip -= 1
+                    else:
+                        if self.width is None:
+                            self.width = len(value)
+                        self.count += 1
+                        yield value
+            except RdsConnectionError as error:
+                if self._reopen is None:
+                    raise
+                self._attempts += 1
+                self._fp = self._reopen(error, self._attempts)
+                self._reader = _Reader(self._fp, self._chunk_size)
+                self._events = _iter_events(self._reader)
+                skip = self.count
+
+    def __getitem__(self, name):
+        if name not in self._members:
+            # skips whatever records were not iterated
+            for _ in self.records():
+                pass
+        return self._members[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def close(self):
+        """Closes the response, discarding whatever has not been read."""
+        self._events.close()
+        if hasattr(self._fp, "close"):
+            self._fp.close()
+
+
+def _iter_events(reader):
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.next()
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == "records" and reader.peek() == "[":
+            reader.next()
+            if reader.peek() == "]":
+                reader.next()
+            else:
+                while True:
+                    yield "record", reader.value()
+                    if reader.separator("]"):
+                        break
+        else:
+            yield name, reader.value()
+
+        if reader.separator("}"):
+            return
+
+
+class _Reader:
+    def __init__(self, fp, chunk_size):
+        self._fp = fp
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self.size = 0
+
+    def value(self):
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._position = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            self._fill()
+
+    def peek(self):
+        self._skip_whitespace()
+        if self._position >= len(self._buffer):
+            raise ValueError("Unexpected end of JSON page")
+        return self._buffer[self._position]
+
+    def next(self):
+        character = self.peek()
+        self._position += 1
+        return character
+
+    def expect(self, character):
+        if self.next() != character:
+            raise ValueError(
+                "Expected '" + character + "' at position " + str(self._position - 1)
+            )
+
+    def separator(self, closing):
+        # reads the comma between members, or the closing character that ends them
+        character = self.next()
+        if character == closing:
+            return True
+        if character != ",":
+            raise ValueError(
+                "Expected ',' or '"
+                + closing
+                + "' at position "
+                + str(self._position - 1)
+            )
+        return False
+
+    def _skip_whitespace(self):
+        while True:
+            while (
+                self._position < len(self._buffer)
+                and self._buffer[self._position] in _WHITESPACE
+            ):
+                self._position += 1
+            if self._position < len(self._buffer) or self._eof:
+                return
+            self._fill()
+
+    def _fill(self):
+        data = self._fp.read(self._chunk_size)
+        self.size += len(data)
+        if not data:
+            self._eof = True
+            text = self._text_decoder.decode(b"", final=True)
+        else:
+            text = self._text_decoder.decode(data)
+        # drop what has already been parsed so the buffer stays around a chunk in size
+        self._buffer = self._buffer[self._position :] + text
+        self._position = 0
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pooled HTTP transport that keeps connections to RDS hosts alive between calls
+"""
+
+import http.client as httplib
+import threading
+import time
+import zlib
+
+from urllib.parse import urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+from .exceptions import RdsConnectionError
+from .retry import RetryPolicy
+from .stats import RequestStats
+
+_CHUNK_SIZE = 64 * 1024
+_MAX_REDIRECTS = 5
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+
+class Transport:
+    """
+    Makes GET requests over keep-alive connections that are pooled per host, so that many
+    calls to the same server reuse a handful of sockets.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        The number of idle connections kept open per host. The default is 10.
+    timeout : float, optional
+        Socket timeout in seconds. The default is None which uses the global socket default.
+    compress : bool, optional
+        flag for asking the server for gzip/deflate encoded responses. The default is True.
+    retry : RetryPolicy, optional
+        When and how long to wait before retrying failed requests. The default is None which
+        uses a RetryPolicy with its defaults, pass ``RetryPolicy(total=0)`` to never retry.
+    rate_limiter : RateLimiter, optional
+        Limits how many requests are sent per second, and can be shared between transports.
+        The default is None which sends requests as fast as they are made.
+    observer : StatsCollector, optional
+        Receives the timings of every request and query, any object with ``on_request`` and
+        ``on_query`` methods. The default is None.
+    """
+
+    def __init__(
+        self,
+        pool_size=10,
+        timeout=None,
+        compress=True,
+        retry=None,
+        rate_limiter=None,
+        observer=None,
+    ):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.compress = compress
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.observer = observer
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def open(self, url, headers=None):
+        """
+        Sends a GET request, following redirects.
+
+        Parameters
+        ----------
+        url : str
+            The full url to request.
+        headers : dict, optional
+            Additional request headers. The default is None.
+
+        Returns
+        -------
+        Response
+            A file-like object over the decoded response body.
+
+        Raises
+        ------
+        RdsConnectionError
+            If the connection failed or was dropped.
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = self._open(url, headers)
+            except (httplib.HTTPException, OSError) as e:
+                raise RdsConnectionError(
+                    "Error connecting for [" + url + "]: " + str(e), url
+                )
+            location = response.headers.get("Location")
+            if response.status not in _REDIRECT_CODES or location is None:
+                return response
+            response.read()
+            url = urljoin(url, location)
+        raise RdsConnectionError("Too many redirects requesting [" + url + "].", url)
+
+    def close(self):
+        """Closes every idle connection held by the transport."""
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for connections in pools.values():
+            for connection in connections:
+                connection.close()
+
+    def _open(self, url, headers):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        request_headers = {}
+        if self.compress:
+            request_headers["Accept-Encoding"] = "gzip, deflate"
+        if headers:
+            request_headers.update(headers)
+
+        stats = RequestStats(url)
+        connection, reused = self._acquire(key)
+        target = self._target(parts, connection)
+        try:
+            if not reused:
+                self._open_connection(connection, stats)
+            connection.request("GET", target, headers=request_headers)
+            raw = connection.getresponse()
+        except (httplib.HTTPException, OSError):
+            connection.close()
+            if not reused:
+                raise
+            # the server may have dropped an idle keep-alive connection, retry on a new one
+            connection = self._connect(key)
+            self._open_connection(connection, stats)
+            connection.request("GET", target, headers=request_headers)
+            raw = connection.getresponse()
+
+        stats.first_byte_time = time.perf_counter() - stats.start - stats.connect_time
+        return Response(self, key, connection, raw, url, stats)
+
+    def _open_connection(self, connection, stats):
+        # connecting up front separates the DNS, TCP and TLS time from the request
+        start = time.perf_counter()
+        connection.connect()
+        stats.connect_time += time.perf_counter() - start
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._pools.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(key), False
+
+    def _release(self, key, connection, reusable):
+        if reusable:
+            with self._lock:
+                idle = self._pools.setdefault(key, [])
+                if len(idle) < self.pool_size:
+                    idle.append(connection)
+                    return
+        connection.close()
+
+    def _connect(self, key):
+        scheme, netloc = key
+        kwargs = {} if self.timeout is None else {"timeout": self.timeout}
+        proxy = _get_proxy(scheme, netloc)
+        if proxy is None:
+            if scheme == "https":
+                return httplib.HTTPSConnection(netloc, **kwargs)
+            return httplib.HTTPConnection(netloc, **kwargs)
+
+        if scheme == "https":
+            connection = httplib.HTTPSConnection(proxy, **kwargs)
+            connection.set_tunnel(netloc)
+        else:
+            connection = httplib.HTTPConnection(proxy, **kwargs)
+            connection._rds_proxied = True
+        return connection
+
+    def _target(self, parts, connection):
+        if getattr(connection, "_rds_proxied", False):
+            return parts.geturl()
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        return target
+
+
+class Response:
+    """
+    A file-like response body that hands its connection back to the pool once read to the end.
+    """
+
+    def __init__(self, transport, key, connection, raw, url, stats=None):
+        self.status = raw.status
+        self.reason = raw.reason
+        self.headers = raw.headers if hasattr(raw, "headers") else raw.msg
+        self.url = url
+        self.stats = stats if stats is not None else RequestStats(url)
+        self.stats.status = raw.status
+        # called with the stats once the body has been read or the response closed
+        self.on_finish = None
+        self._transport = transport
+        self._key = key
+        self._connection = connection
+        self._raw = raw
+        self._buffer = b""
+
+        encoding = (raw.getheader("Content-Encoding") or "").lower()
+        self._decoder = None
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            # 32 + MAX_WBITS detects either a gzip or a zlib header
+            self._decoder = zlib.decompressobj(32 + zlib.MAX_WBITS)
+
+    def getcode(self):
+        return self.status
+
+    def read(self, amt=None):
+        try:
+            return self._read(amt)
+        except (httplib.HTTPException, OSError, zlib.error) as e:
+            # the connection is in an unknown state once a read fails part way
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            raise RdsConnectionError(
+                "Error reading response from [" + self.url + "]: " + str(e), self.url
+            )
+
+    def close(self):
+        if self._connection is not None and not self._raw.isclosed():
+            # an unread body leaves the connection in an unusable state
+            self._raw.close()
+            self._connection.close()
+            self._connection = None
+        self._release()
+        self._finish()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, amt):
+        start = time.perf_counter()
+        if amt is None or amt < 0:
+            data = self._buffer + self._decode(self._read_raw(None))
+            self._buffer = b""
+        else:
+            while len(self._buffer) < amt and not self._raw.isclosed():
+                self._buffer += self._decode(self._read_raw(_CHUNK_SIZE))
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        self.stats.read_time += time.perf_counter() - start
+        if self._raw.isclosed() and self._raw.length:
+            # reads of a given size end quietly when the server closes before the whole body
+            raise httplib.IncompleteRead(data, self._raw.length)
+        self._release()
+        if self._raw.isclosed():
+            self._finish()
+        return data
+
+    def _read_raw(self, amt):
+        data = self._raw.read() if amt is None else self._raw.read(amt)
+        self.stats.bytes += len(data)
+        return data
+
+    def _decode(self, data):
+        if self._decoder is None:
+            return data
+        decoded = self._decoder.decompress(data)
+        if self._raw.isclosed():
+            decoded += self._decoder.flush()
+        return decoded
+
+    def _release(self):
+        if self._connection is not None and self._raw.isclosed():
+            reusable = not self._raw.will_close
+            self._transport._release(self._key, self._connection, reusable)
+            self._connection = None
+
+    def _finish(self):
+        if self.stats.total_time is None:
+            self.stats.total_time = time.perf_counter() - self.stats.start
+            if self.on_finish is not None:
+                self.on_finish(self.stats)
+
+
+_default_transport = None
+_default_lock = threading.Lock()
+
+
+def default_transport():
+    """Returns the transport shared by objects that were not given one."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
+
+
+def _get_proxy(scheme, netloc):
+    proxy = getproxies().get(scheme)
+    if proxy is None or proxy_bypass(netloc.split(":")[0]):
+        return None
+    return urlsplit(proxy).netloc or proxy
@@ -6,54 +6,124 @@ Created on Fri May 22 10:13:22 2020
 @author: seanlucas
 """
 
-import sys
 import json
+import time
 
+from .exceptions import RdsError, RdsHTTPError
+from .retry import parse_retry_after
+from .stats import RequestStats
+from .transport import default_transport
 
-#TODO add api key header
-def get_response(api_call, api_key, message=""):
-    if sys.version_info > (3, 0):
-        import urllib.request
 
-        try:
-            request = urllib.request.Request(api_call)
-            if (api_key is not None):
-                request.add_header('X-API-KEY', api_key)
-            response = urllib.request.urlopen(request)
-            
-            if (response.getcode() != 200):
-                raise Exception("Error making call [" + api_call + "], response code [" + response.getcode() + "].")
-            
-            return response
-        except urllib.error.HTTPError as e:
-            print(e)
-            print(message)
-            sys.exit()
-    else:
-        import urllib
+def get_response(api_call, api_key, message="", transport=None, parse=None):
+    """
+    Requests a url, retrying failures the transport's retry policy allows.
+
+    Parameters
+    ----------
+    parse : function, optional
+        Reads the response. When given, a failure while reading the body retries the whole
+        request and the parsed value is returned instead of the response. The default is None.
+
+    Raises
+    ------
+    RdsHTTPError
+        If the server answered with an error status.
+    RdsConnectionError
+        If the connection failed or was dropped.
+    """
+    if transport is None:
+        transport = default_transport()
+
+    headers = {}
+    if api_key is not None:
+        headers["X-API-KEY"] = api_key
 
+    observer = transport.observer
+    attempt = 0
+    while True:
         try:
-            request = urllib.Request(api_call)
-            if (api_key is not None):
-                request.add_header('X-API-KEY', api_key)
-            response = urllib.urlopen(api_call)
-            
-            if (response.getcode() != 200):
-                raise Exception("Error making call [" + api_call + "], response code [" + response.getcode() + "].")
-            
-            return response
-        except urllib.HTTPError as e:
-            print(e)
-            print(message)
-            sys.exit()
-
-
-def check_valid(api_call, api_key, message, is_json=False):
-    try:
-        response = get_response(api_call, api_key, message=message)
-        if is_json:
-            return json.load(response)
-    except Exception as e:
-        print(e)
-        print(message)
-        sys.exit()
+            response = _open(api_call, headers, message, transport, attempt)
+            if parse is None:
+                # the caller reads the body, the stats are reported once it is done
+                if observer is not None:
+                    response.on_finish = observer.on_request
+                return response
+            with response:
+                start = time.perf_counter()
+                value = parse(response)
+                elapsed = time.perf_counter() - start
+            if observer is not None:
+                stats = response.stats
+                stats.parse_time = max(elapsed - stats.read_time, 0.0)
+                observer.on_request(stats)
+            return value
+        except RdsError as error:
+            if observer is not None and not isinstance(error, RdsHTTPError):
+                stats = RequestStats(api_call)
+                stats.retries = attempt
+                stats.error = str(error)
+                observer.on_request(stats)
+            attempt += 1
+            wait_to_retry(transport, error, attempt)
+
+
+def wait_to_retry(transport, error, attempt):
+    """Sleeps before a retry, or raises the error when it should not be retried."""
+    delay = None
+    if transport.retry is not None:
+        delay = transport.retry.get_delay(error, attempt)
+    if delay is None:
+        raise error
+    time.sleep(delay)
+
+
+def get_json(
+    api_call, api_key, transport=None, metadata_cache=None, endpoint=None, message=""
+):
+    if metadata_cache is not None:
+        metadata = metadata_cache.get(endpoint, api_call)
+        if metadata is not None:
+            return metadata
+
+    metadata = get_response(api_call, api_key, message, transport, json.load)
+    if metadata_cache is not None:
+        metadata_cache.set(endpoint, api_call, metadata)
+    return metadata
+
+
+def check_valid(
+    api_call,
+    api_key,
+    message,
+    is_json=False,
+    transport=None,
+    metadata_cache=None,
+    endpoint=None,
+):
+    # the message explains what was invalid in the error raised by a failed request
+    if is_json:
+        return get_json(api_call, api_key, transport, metadata_cache, endpoint, message)
+    get_response(
+        api_call, api_key, message, transport, lambda response: response.read()
+    )
+
+
+def _open(api_call, headers, message, transport, attempt):
+    response = transport.open(api_call, headers)
+    response.stats.retries = attempt
+    if response.getcode() != 200:
+        # reading the error body lets the connection go back to the pool
+        response.read()
+        response.close()
+        if transport.observer is not None:
+            response.stats.error = "HTTP Error " + str(response.getcode())
+            transport.observer.on_request(response.stats)
+        raise RdsHTTPError(
+            response.getcode(),
+            response.reason,
+            api_call,
+            message,
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+    return response
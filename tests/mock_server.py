@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for an RDS server that serves a synthetic catalog so the client can be
+exercised without network access.
+"""
+
+import gzip
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SEX_CODES = [
+    {"codeValue": "1", "name": "Male"},
+    {"codeValue": "2", "name": "Female"},
+]
+# a classification large enough to need several pages of codes
+REGION_CODES = [
+    {"codeValue": "%04d" % i, "name": "Region %d" % i} for i in range(2345)
+]
+CLASSIFICATIONS = {"sex": SEX_CODES, "region": REGION_CODES}
+
+
+class MockRdsServer:
+    """
+    Serves a single catalog ``test`` holding a single data product ``synthetic``.
+
+    Parameters
+    ----------
+    rows : int, optional
+        Number of records in the data product. The default is 1000.
+    cols : int, optional
+        Number of columns in the data product, at least 4. The default is 6.
+    latency : float, optional
+        Seconds to sleep before answering every request. The default is 0.
+    max_cells : int, optional
+        Largest number of cells a single select page may hold. The default is 10000.
+    max_codes : int, optional
+        Largest number of codes a single page may hold. The default is None for no limit.
+    compress : bool, optional
+        flag for gzip encoding responses to clients that accept it. The default is True.
+    """
+
+    catalog_id = "test"
+    dataproduct_id = "synthetic"
+
+    def __init__(
+        self,
+        rows=1000,
+        cols=6,
+        latency=0.0,
+        max_cells=10000,
+        compress=True,
+        max_codes=None,
+    ):
+        self.rows = rows
+        self.cols = max(cols, 4)
+        self.latency = latency
+        self.max_cells = max_cells
+        self.max_codes = max_codes
+        self.compress = compress
+        self.last_update = "2020-07-01T00:00:00Z"
+        self.connections = 0
+        self.requests = []
+        self._failures = []
+        self._lock = threading.Lock()
+        self.variables = _make_variables(self.cols)
+        self.records = [_make_record(i, self.cols) for i in range(rows)]
+
+        server = self
+
+        class Handler(_Handler):
+            mock = server
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d/rds" % self._httpd.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count_requests(self, fragment):
+        """Returns how many requests were made to paths containing ``fragment``."""
+        with self._lock:
+            return len([path for path in self.requests if fragment in path])
+
+    def fail(self, fragment, status=503, times=1, retry_after=None):
+        """
+        Makes the next ``times`` requests to paths containing ``fragment`` fail with
+        ``status``, or drop the connection half way through the body when status is None.
+        """
+        with self._lock:
+            self._failures.append([fragment, status, times, retry_after])
+
+    def _take_failure(self, path):
+        with self._lock:
+            for failure in self._failures:
+                if failure[0] in path and failure[2] > 0:
+                    failure[2] -= 1
+                    return failure
+        return None
+
+    def _record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def _record_request(self, path):
+        with self._lock:
+            self.requests.append(path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, which Nagle would delay on kept-alive
+    # connections
+    disable_nagle_algorithm = True
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.mock._record_connection()
+
+    def do_GET(self):
+        mock = self.mock
+        mock._record_request(self.path)
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part][1:]
+        failure = mock._take_failure(self.path)
+        if failure is not None and failure[1] is not None:
+            headers = {}
+            if failure[3] is not None:
+                headers["Retry-After"] = str(failure[3])
+            return self._send(failure[1], {"message": "Unavailable"}, headers)
+
+        try:
+            status, body = _route(mock, parts, query)
+        except (KeyError, ValueError, IndexError) as e:
+            status, body = 400, {"message": str(e)}
+        self._send(status, body, truncate=failure is not None)
+
+    def _send(self, status, body, headers=None, truncate=False):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.mock.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            payload = gzip.compress(payload)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if truncate:
+            self.wfile.write(payload[: len(payload) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+
+def _route(mock, parts, query):
+    if parts[:2] == ["api", "server"]:
+        return 200, {"name": "mock", "version": "1.0"}
+    if parts == ["api", "catalog"]:
+        return 200, {"catalogs": [_catalog_metadata(mock)]}
+    if parts[:2] == ["api", "catalog"]:
+        if parts[2] != mock.catalog_id:
+            return 404, {"message": "Unknown catalog"}
+        if len(parts) == 3:
+            return 200, _catalog_metadata(mock)
+        if parts[3] != mock.dataproduct_id:
+            return 404, {"message": "Unknown data product"}
+        return _route_metadata(mock, parts[4:], query)
+    if parts[:2] == ["api", "query"]:
+        if parts[2:4] != [mock.catalog_id, mock.dataproduct_id]:
+            return 404, {"message": "Unknown data product"}
+        if parts[4] == "count":
+            return 200, mock.rows
+        if parts[4] == "select":
+            return _select(mock, query)
+        if parts[4] == "tabulate":
+            return _tabulate(mock, query)
+    return 404, {"message": "Not found"}
+
+
+def _route_metadata(mock, parts, query):
+    if not parts:
+        return 200, {
+            "id": mock.dataproduct_id,
+            "name": "Synthetic",
+            "description": "Synthetic records",
+            "lastUpdate": mock.last_update,
+            "uri": "/catalog/test/synthetic",
+            "variables": mock.variables,
+        }
+    if parts == ["variables"]:
+        return 200, mock.variables
+    if parts[0] == "variable":
+        return 200, _find_variable(mock, parts[1])
+    if parts == ["variables", "profile"]:
+        column = _column_index(mock, query["cols"])
+        values = [r[column] for r in mock.records if r[column] is not None]
+        return 200, [
+            {
+                "id": query["cols"],
+                "minimum": min(values) if values else None,
+                "maximum": max(values) if values else None,
+            }
+        ]
+    if parts == ["classifications"]:
+        return 200, [
+            {"id": name, "codeCount": len(codes)}
+            for name, codes in CLASSIFICATIONS.items()
+        ]
+    if parts[0] == "classification" and parts[1] in CLASSIFICATIONS:
+        codes = CLASSIFICATIONS[parts[1]]
+        if len(parts) == 2:
+            return 200, {"id": parts[1], "codeCount": len(codes)}
+        offset = int(query.get("offset", 0))
+        limit = int(query.get("limit", 20))
+        if mock.max_codes is not None:
+            limit = min(limit, mock.max_codes)
+        return 200, codes[offset : offset + limit]
+    return 404, {"message": "Not found"}
+
+
+def _catalog_metadata(mock):
+    return {
+        "id": mock.catalog_id,
+        "name": "Test",
+        "description": "Test catalog",
+        "uri": "/catalog/test",
+    }
+
+
+def _make_variables(cols):
+    variables = [
+        {"id": "id", "name": "id", "storageType": "INTEGER"},
+        {"id": "date_stamp", "name": "date_stamp", "storageType": "TEXT"},
+        {
+            "id": "sex",
+            "name": "sex",
+            "label": "Sex",
+            "storageType": "TEXT",
+            "classification": {"id": "sex"},
+        },
+        {"id": "value", "name": "value", "storageType": "DECIMAL"},
+    ]
+    for i in range(4, cols):
+        name = "c%d" % i
+        variables.append({"id": name, "name": name, "storageType": "INTEGER"})
+    return variables
+
+
+def _make_record(i, cols):
+    record = [
+        i,
+        "2020-%02d-%02d" % (i // 28 % 12 + 1, i % 28 + 1),
+        SEX_CODES[i % 2]["codeValue"],
+        None if i % 7 == 0 else i / 4.0,
+    ]
+    record.extend(i * column for column in range(4, cols))
+    return record
+
+
+def _find_variable(mock, name):
+    for variable in mock.variables:
+        if variable["id"] == name:
+            return variable
+    raise KeyError("Unknown variable " + name)
+
+
+def _column_index(mock, name):
+    for index, variable in enumerate(mock.variables):
+        if variable["id"] == name:
+            return index
+    raise KeyError("Unknown variable " + name)
+
+
+def _filter(mock, where):
+    if not where:
+        return mock.records
+    records = mock.records
+    for clause in where.split(" and "):
+        for operator in (">=", "<=", "!=", ">", "<", "="):
+            if operator in clause:
+                name, value = clause.split(operator, 1)
+                records = _apply(records, _column_index(mock, name), operator, value)
+                break
+    return records
+
+
+def _apply(records, column, operator, value):
+    def matches(cell):
+        if value == "":
+            return (cell is None) == (operator == "=")
+        if cell is None:
+            return False
+        other = type(cell)(value) if not isinstance(cell, str) else value
+        if operator == ">=":
+            return cell >= other
+        if operator == "<=":
+            return cell <= other
+        if operator == ">":
+            return cell > other
+        if operator == "<":
+            return cell < other
+        if operator == "!=":
+            return cell != other
+        return cell == other
+
+    return [record for record in records if matches(record[column])]
+
+
+def _select(mock, query):
+    if "cols" in query:
+        columns = [_column_index(mock, name) for name in query["cols"].split(",")]
+    else:
+        columns = list(range(mock.cols))
+    coloffset = int(query.get("coloffset", 0))
+    columns = columns[coloffset:]
+    if "collimit" in query:
+        columns = columns[: int(query["collimit"])]
+
+    limit = int(query.get("limit", 20))
+    offset = int(query.get("offset", 0))
+    if limit * len(columns) > mock.max_cells:
+        return 400, {"message": "Too many cells requested"}
+
+    records = _filter(mock, query.get("where"))
+    page = records[offset : offset + limit]
+    inject = query.get("inject") == "true"
+    rows = [[_cell(mock, record, c, inject) for c in columns] for record in page]
+
+    info = {"moreRows": offset + len(page) < len(records)}
+    if query.get("count") == "true":
+        info["rowCount"] = len(records)
+    variables = []
+    if query.get("metadata", "true") == "true":
+        variables = [mock.variables[c] for c in columns]
+    return 200, {"info": info, "variables": variables, "records": rows, "totals": []}
+
+
+def _tabulate(mock, query):
+    records = _filter(mock, query.get("where"))
+    dims = query["dims"].split(",") if "dims" in query else []
+    columns = [_column_index(mock, name) for name in dims]
+    inject = query.get("inject") == "true"
+
+    counts = {}
+    for record in records:
+        key = tuple(_cell(mock, record, c, inject) for c in columns)
+        counts[key] = counts.get(key, 0) + 1
+    rows = [list(key) + [counts[key]] for key in sorted(counts, key=str)]
+
+    totals = []
+    if query.get("totals") == "true":
+        totals = [[None] * len(columns) + [len(records)]]
+    info = {"moreRows": False}
+    if query.get("count") == "true":
+        info["rowCount"] = len(rows)
+    variables = []
+    if query.get("metadata", "true") == "true":
+        variables = [mock.variables[c] for c in columns]
+        variables.append({"id": "count", "name": "count", "storageType": "INTEGER"})
+    return 200, {"info": info, "variables": variables, "records": rows, "totals": totals}
+
+
+def _cell(mock, record, column, inject):
+    value = record[column]
+    if inject and mock.variables[column].get("classification"):
+        for code in SEX_CODES:
+            if code["codeValue"] == value:
+                return code["name"]
+    return value
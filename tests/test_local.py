@@ -0,0 +1,932 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# tests that run against a local stand-in RDS server instead of the live host
+import sys, os
+sys.path.insert(0, os.path.abspath(".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import asyncio
+import csv
+import io
+import json
+import time
+
+import pytest
+
+from rds import (
+    AsyncServer,
+    AsyncTransport,
+    ChainedRecords,
+    CompactRecords,
+    MetadataCache,
+    PageSizer,
+    RateLimiter,
+    RdsError,
+    RdsHTTPError,
+    ResultCache,
+    RetryPolicy,
+    Server,
+    SpilledRecords,
+    SpillStore,
+    StatsCollector,
+    Transport,
+)
+from rds.aio import _read_response
+from rds.stream import StreamedPage, read_page
+from mock_server import MockRdsServer
+
+
+@pytest.fixture(scope="module")
+def mock():
+    with MockRdsServer(rows=2500, cols=8) as mock:
+        yield mock
+
+
+@pytest.fixture
+def dataproduct(mock):
+    server = Server(mock.url)
+    return server.get_catalog("test").get_dataproduct("synthetic")
+
+
+# testing parallel batching
+def test_select_parallel(mock, dataproduct):
+    serial = dataproduct.select()
+    parallel = dataproduct.select(max_workers=4)
+
+    assert len(parallel.records) == 2500
+    assert parallel.records == serial.records == mock.records
+    assert parallel.columns == serial.columns
+
+
+def test_select_parallel_limit_offset(mock, dataproduct):
+    results = dataproduct.select(limit=2100, offset=150, max_workers=3)
+
+    assert results.records == mock.records[150:2250]
+
+
+def test_select_parallel_count(dataproduct):
+    results = dataproduct.select(count=True, max_workers=2)
+
+    assert results.count == 2500
+
+
+# testing the pooled transport
+def test_transport_reuses_connections(mock):
+    connections = mock.connections
+    server = Server(mock.url, transport=Transport(pool_size=2))
+    dataproduct = server.get_catalog("test").get_dataproduct("synthetic")
+    results = dataproduct.select()
+
+    assert len(results.records) == 2500
+    assert mock.connections - connections == 1
+
+
+def test_transport_gzip(mock):
+    transport = Transport(compress=True)
+    response = transport.open(mock.url + "/api/catalog/test")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(response.read().decode("utf-8"))["id"] == "test"
+
+
+# testing streaming iteration
+def test_iter_select(mock, dataproduct):
+    assert list(dataproduct.iter_select()) == mock.records
+    assert list(dataproduct.iter_select(limit=30, offset=10)) == mock.records[10:40]
+
+
+def test_iter_pages(mock, dataproduct):
+    pages = list(dataproduct.iter_pages(cols=["id", "value"], count=True, max_workers=3))
+
+    assert len(pages) == 1
+    assert pages[0].columns == ["id", "value"]
+    assert pages[0].count == 2500
+
+    pages = list(dataproduct.iter_pages(max_workers=3))
+    assert len(pages) == 2
+    assert [record for page in pages for record in page.records] == mock.records
+
+
+def test_iter_select_stops_early(dataproduct):
+    records = dataproduct.iter_select(max_workers=4)
+    first = next(records)
+    records.close()
+
+    assert first[0] == 0
+
+
+# testing page parsing
+def test_read_page():
+    page = {
+        "info": {"moreRows": False, "rowCount": 3},
+        "records": [[1, 12345.678, "Fr\u00e9d\u00e9ric"], [2, None, "a, ]}"], [3, -1e-05, ""]],
+        "totals": [],
+    }
+    body = json.dumps(page, ensure_ascii=False).encode("utf-8")
+    assert read_page(io.BytesIO(body)) == page
+    assert read_page(io.BytesIO(body)).size == len(body)
+
+    # small chunks split numbers, strings and multi-byte characters across reads
+    for chunk_size in (1, 2, 3, 7, 64):
+        streamed = StreamedPage(io.BytesIO(body), chunk_size)
+        assert list(streamed.records()) == page["records"]
+        assert streamed["info"] == page["info"] and streamed["totals"] == []
+    assert list(StreamedPage(io.BytesIO(b'{ "records" : [ ] }')).records()) == []
+
+
+def test_streamed_page():
+    body = json.dumps({"records": [[1, 2], [3, 4]], "info": {"moreRows": True}})
+    page = StreamedPage(io.BytesIO(body.encode("utf-8")), 4)
+    records = page.records()
+
+    assert next(records) == [1, 2]
+    assert page.width == 2
+    assert page["info"] == {"moreRows": True}
+    assert page.count == 2
+
+
+def test_iter_select_streams(mock, dataproduct):
+    connections = mock.connections
+    assert list(dataproduct.iter_select(limit=1300, offset=7)) == mock.records[7:1307]
+
+    # abandoning a page part way through still leaves a usable transport
+    records = dataproduct.iter_select()
+    assert next(records) == mock.records[0]
+    records.close()
+    assert dataproduct.select(cols=["id"], limit=3).records == [[0], [1], [2]]
+    assert mock.connections - connections <= 2
+
+
+# testing retries and rate limiting
+def _retrying_dataproduct(mock, **kwargs):
+    transport = Transport(retry=RetryPolicy(backoff_factor=0.01), **kwargs)
+    server = Server(mock.url, transport=transport)
+    return server.get_catalog("test").get_dataproduct("synthetic")
+
+
+def test_retry_failed_page(mock):
+    dataproduct = _retrying_dataproduct(mock)
+    selects = mock.count_requests("/select?")
+    mock.fail("offset=1250", status=503, times=2, retry_after=0)
+    results = dataproduct.select(max_workers=2)
+
+    assert results.records == mock.records
+    # only the failing page is requested again
+    assert mock.count_requests("/select?") - selects == 4
+
+
+def test_retry_dropped_page(mock):
+    dataproduct = _retrying_dataproduct(mock)
+    mock.fail("offset=0", status=None)
+    assert dataproduct.select(limit=1300).records == mock.records[:1300]
+
+    mock.fail("offset=0", status=None)
+    assert list(dataproduct.iter_select()) == mock.records
+
+
+def test_retry_gives_up(mock):
+    dataproduct = _retrying_dataproduct(mock)
+    mock.fail("/count", status=503, times=4)
+    with pytest.raises(RdsHTTPError) as error:
+        dataproduct.count()
+    assert error.value.status == 503
+
+    with pytest.raises(RdsHTTPError) as error:
+        dataproduct.select(cols=["missing"])
+    assert error.value.status == 400
+
+    with pytest.raises(RdsError):
+        Server(mock.url).get_catalog("wrong")
+
+
+def test_retry_policy():
+    policy = RetryPolicy(total=2, backoff_factor=1, max_backoff=10, jitter=False)
+    unavailable = RdsHTTPError(503, "Service Unavailable", "url", retry_after=5)
+
+    assert policy.get_delay(unavailable, 1) == 5
+    assert policy.get_delay(RdsHTTPError(503, "", "url"), 2) == 2
+    assert policy.get_delay(RdsHTTPError(503, "", "url"), 3) is None
+    assert policy.get_delay(RdsHTTPError(404, "", "url"), 1) is None
+
+
+def test_rate_limiter(mock):
+    dataproduct = _retrying_dataproduct(mock, rate_limiter=RateLimiter(20, burst=1))
+    start = time.monotonic()
+    for _ in range(5):
+        dataproduct.count()
+
+    assert time.monotonic() - start >= 0.19
+
+
+# testing checkpointed queries
+def test_select_checkpoint(mock, dataproduct, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint")
+    mock.fail("offset=1250", status=500)
+    with pytest.raises(RdsHTTPError):
+        dataproduct.select(checkpoint=checkpoint)
+
+    # the restarted query only fetches the page that failed
+    selects = mock.count_requests("/select?")
+    results = dataproduct.select(checkpoint=checkpoint)
+    assert results.records == mock.records
+    assert mock.count_requests("/select?") - selects == 1
+    assert os.listdir(checkpoint) == []
+
+
+def test_select_checkpoint_resized(mock, dataproduct, tmp_path):
+    checkpoint = str(tmp_path)
+    mock.fail("offset=1200", status=500)
+    with pytest.raises(RdsHTTPError):
+        dataproduct.select(checkpoint=checkpoint, page_sizer=PageSizer(max_rows=400))
+
+    # pages sized from their timings differ from the saved ones, whose records are reused
+    selects = mock.count_requests("/select?")
+    results = dataproduct.select(
+        checkpoint=checkpoint, page_sizer=PageSizer(target_time=60.0)
+    )
+    assert results.records == mock.records
+    assert mock.count_requests("/select?") - selects == 2
+    assert mock.count_requests("offset=1200&limit=50") == 1
+    assert os.listdir(checkpoint) == []
+
+
+def test_iter_pages_checkpoint(mock, dataproduct, tmp_path):
+    checkpoint = str(tmp_path)
+    pages = dataproduct.iter_pages(max_workers=2, checkpoint=checkpoint)
+    next(pages)
+    pages.close()
+
+    selects = mock.count_requests("/select?")
+    pages = list(dataproduct.iter_pages(max_workers=2, checkpoint=checkpoint))
+    assert [record for page in pages for record in page.records] == mock.records
+    assert mock.count_requests("/select?") - selects == 1
+
+
+# testing file exports
+def test_export_csv(mock, dataproduct, tmp_path):
+    path = str(tmp_path / "synthetic.csv")
+    assert dataproduct.export(path, cols=["id", "value"], max_workers=2) == 2500
+
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "value"]
+    assert rows[1] == ["0", ""]
+    assert rows[2] == ["1", "0.25"]
+    assert len(rows) == 2501
+
+
+def test_export_parquet(mock, dataproduct, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "synthetic.parquet")
+    assert dataproduct.export(path, format="parquet", inject=True) == 2500
+
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.num_row_groups == 2
+    table = parquet_file.read()
+    assert table.column("id").to_pylist() == list(range(2500))
+    assert table.column("Sex").to_pylist()[:2] == ["Male", "Female"]
+    assert table.column("value").to_pylist()[:2] == [None, 0.25]
+
+    with pytest.raises(ValueError):
+        dataproduct.export(path, format="xlsx")
+
+
+# testing adaptive page sizes
+def test_page_sizer(mock, dataproduct):
+    selects = mock.count_requests("/select?")
+    results = dataproduct.select(page_sizer=PageSizer(max_rows=500), max_workers=2)
+
+    assert results.records == mock.records
+    assert mock.count_requests("/select?") - selects == 5
+
+
+def test_page_sizer_bytes(mock, dataproduct):
+    sizer = PageSizer(max_bytes=16 * 1024)
+    selects = mock.count_requests("/select?")
+    pages = list(dataproduct.iter_pages(limit=2000, page_sizer=sizer))
+
+    assert [record for page in pages for record in page.records] == mock.records[:2000]
+    assert len(pages[1].records) < 1250
+    assert mock.count_requests("/select?") - selects == len(pages)
+
+
+def test_page_sizer_time():
+    sizer = PageSizer(max_cells=10000, target_time=0.5)
+    page = {"records": [[1, 2]] * 1000}
+
+    # pages that arrive quickly grow to the cell limit, slow ones shrink in proportion
+    assert sizer.next_limit(page, 1000, 0.1) == 5000
+    assert sizer.next_limit(page, 1000, 2.0) == 250
+    assert sizer.next_limit({"records": []}, 1000, 2.0) == 1000
+
+
+# testing partitioned queries
+def test_select_partitioned(mock, dataproduct):
+    selects = mock.count_requests("/select?")
+    results = dataproduct.select(partition_by="id", partitions=3, count=True)
+
+    assert results.records == mock.records
+    assert results.count == 2500
+    # three ranges and the null partition, each small enough for a single page
+    assert mock.count_requests("/select?") - selects == 4
+
+
+def test_select_partitioned_nulls(mock, dataproduct):
+    results = dataproduct.select(
+        cols=["id", "value"], partition_by="value", max_workers=3
+    )
+    expected = [[r[0], r[3]] for r in mock.records if r[3] is not None]
+    expected += [[r[0], r[3]] for r in mock.records if r[3] is None]
+
+    assert results.records == expected
+
+
+def test_select_partitioned_dates_and_codes(mock, dataproduct):
+    dates = dataproduct.select(cols=["id"], partition_by="date_stamp", where="id<600")
+    assert sorted(dates.records) == [[i] for i in range(600)]
+
+    codes = dataproduct.select(cols=["id", "sex"], partition_by="sex")
+    assert [record[1] for record in codes.records] == ["1"] * 1250 + ["2"] * 1250
+
+    with pytest.raises(ValueError):
+        dataproduct.select(partition_by="id", limit=10)
+
+
+def test_select_partitioned_without_bounds(mock, monkeypatch):
+    dataproduct = Server(mock.url).get_catalog("test").get_dataproduct("synthetic")
+    # profiles of text variables carry no minimum or maximum
+    monkeypatch.setattr(dataproduct, "profile", lambda column: [{"id": column}])
+    codes = dataproduct.select(cols=["id", "sex"], partition_by="sex")
+    assert [record[1] for record in codes.records] == ["1"] * 1250 + ["2"] * 1250
+
+    with pytest.raises(ValueError):
+        dataproduct.select(cols=["id"], partition_by="date_stamp")
+
+
+# testing chained records
+def test_chained_records():
+    pages = [[[1, "a"], [2, "b"]], [], [[3, "c"], [4, "d"], [5, "e"]]]
+    records = [record for page in pages for record in page]
+    chained = ChainedRecords(pages)
+    assert chained == records and len(chained) == 5
+    assert chained[2] is pages[2][0]
+    assert [chained[i] for i in range(-5, 5)] == records * 2
+    assert chained[1:4] == records[1:4] and chained[::2] == records[::2]
+    assert list(chained) == records
+    assert chained != records[:-1]
+    with pytest.raises(IndexError):
+        chained[5]
+
+
+def test_select_chains_pages(dataproduct):
+    results = dataproduct.select(max_workers=4)
+    assert isinstance(results.records, ChainedRecords)
+    assert [record[0] for record in results.records] == list(range(2500))
+    assert results.records[1250][0] == 1250
+
+
+# testing compact records
+def test_compact_records():
+    records = [[1, 0.5, "A", None, True], [None, 1.5, "B", 2, False], [3, None, "A", 4, None]]
+    compact = CompactRecords(records[:1])
+    compact.append(records[1:])
+    assert compact == records
+    assert len(compact) == 3 and compact.width == 5
+    assert compact[1] == records[1] and compact[-1] == records[-1]
+    assert compact[1:] == records[1:]
+    assert list(compact) == records
+    assert compact.column(2) == ["A", "B", "A"]
+    with pytest.raises(IndexError):
+        compact[3]
+
+    # columns holding mixed values, large integers or only nulls so far
+    compact = CompactRecords([[None, 1, 1], [None, 2, 2]])
+    compact.append([["x", "y", 2**70], [1, 2.5, 3]])
+    assert compact == [[None, 1, 1], [None, 2, 2], ["x", "y", 2**70], [1, 2.5, 3]]
+
+
+def test_select_compact(dataproduct):
+    expected = dataproduct.select()
+    results = dataproduct.select(compact=True, count=True)
+    assert isinstance(results.records, CompactRecords)
+    assert results.records == expected.records
+    assert results.columns == expected.columns
+    assert results.count == 2500
+    with pytest.raises(ValueError):
+        dataproduct.select(compact=True, as_columns=True)
+
+
+# testing client side label injection
+def test_select_inject_client(mock):
+    dataproduct = Server(mock.url).get_catalog("test").get_dataproduct("synthetic")
+    expected = dataproduct.select(inject=True)
+    codes = mock.count_requests("/codes")
+    injected = mock.count_requests("inject=true")
+    results = dataproduct.select(inject="client", max_workers=2)
+    assert results.records == expected.records
+    assert results.columns == expected.columns
+    assert list(dataproduct.iter_select(inject="client", limit=10)) == expected.records[:10]
+    assert mock.count_requests("/codes") - codes == 1
+    # only the codes are sent by the server
+    assert mock.count_requests("inject=true") == injected
+
+    results = dataproduct.select(inject="client", metadata=False, limit=10)
+    assert results.columns is None
+    assert results.records == expected.records[:10]
+
+
+def test_tabulate_inject_client(dataproduct):
+    expected = dataproduct.tabulate(dims=["sex"], totals=True, inject=True)
+    results = dataproduct.tabulate(dims=["sex"], totals=True, inject="client")
+    assert sorted(results.records) == sorted(expected.records)
+    assert results.totals == expected.totals
+
+
+# testing complete code lists
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_get_codes(mock, dataproduct, max_workers):
+    requests = mock.count_requests("/classification/region/codes")
+    codes = dataproduct.get_codes("region", page_size=500, max_workers=max_workers)
+    assert [code["codeValue"] for code in codes] == ["%04d" % i for i in range(2345)]
+    assert mock.count_requests("/classification/region/codes") - requests == 5
+    assert dataproduct.get_code("region", limit=2, offset=10)[0]["codeValue"] == "0010"
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_get_codes_short_pages(mock, dataproduct, max_workers):
+    # servers may cap the codes per page below the page size asked for
+    mock.max_codes = 300
+    try:
+        codes = dataproduct.get_codes("region", page_size=500, max_workers=max_workers)
+    finally:
+        mock.max_codes = None
+    assert [code["codeValue"] for code in codes] == ["%04d" % i for i in range(2345)]
+
+
+def test_code_index(mock, dataproduct):
+    index = dataproduct.get_code_index("sex")
+    assert len(index) == 2 and "1" in index and 1 in index
+    assert index.label("2") == "Female" and index.label(2) == "Female"
+    assert index.code("Male") == "1"
+    assert index.code("Unknown") is None
+    requests = mock.count_requests("/classification/sex/codes")
+    assert dataproduct.get_code_index("sex") is index
+    assert mock.count_requests("/classification/sex/codes") == requests
+
+
+# testing process pool decoding
+def test_select_processes(dataproduct, tmp_path):
+    expected = dataproduct.select()
+    results = dataproduct.select(processes=2, count=True)
+    assert results.records == expected.records
+    assert results.columns == expected.columns
+    assert results.count == 2500
+    assert all(isinstance(page, CompactRecords) for page in results.records._pages)
+
+    results = dataproduct.select(processes=2, compact=True, inject="client")
+    assert isinstance(results.records, CompactRecords)
+    assert results.records == dataproduct.select(inject=True).records
+
+    arrays = dataproduct.select(processes=2, as_columns=True).arrays
+    assert list(arrays["id"]) == list(range(2500))
+    with pytest.raises(ValueError):
+        dataproduct.select(processes=2, checkpoint=str(tmp_path))
+
+
+def test_select_processes_transport(mock):
+    collector = StatsCollector(history=20)
+    dataproduct = _retrying_dataproduct(
+        mock, rate_limiter=RateLimiter(20, burst=1), observer=collector
+    )
+    mock.fail("offset=1250", status=503, times=1, retry_after=0)
+    start = time.monotonic()
+    results = dataproduct.select(processes=2, page_sizer=PageSizer(max_rows=250))
+    assert len(results.records) == 2500
+
+    # ten pages and one retry, all held to the rate limit and seen by the observer
+    assert time.monotonic() - start >= 0.45
+    totals = collector.snapshot()
+    assert totals["pages"] == 10
+    assert totals["errors"] == 1 and totals["retries"] == 1
+    assert sum(1 for stats in collector.requests if "/select?" in stats.url) == 11
+
+    mock.fail("offset=1250", status=404, times=1)
+    with pytest.raises(RdsHTTPError) as error:
+        dataproduct.select(processes=2)
+    assert error.value.status == 404
+
+
+# testing spilled results
+def test_spill_store(tmp_path):
+    records = [[1, 0.5, "A", None, True], [None, 1.5, "B", 2, False], [3, None, "é", 4, None]]
+    store = SpillStore(str(tmp_path))
+    store.append(records[:1])
+    store.append(CompactRecords(records[1:]))
+    # a column that changes kind is rewritten as JSON
+    store.append([[2**70, "x", 1, 5, {"a": 1}]])
+    spilled = store.open()
+    assert spilled == records + [[2**70, "x", 1, 5, {"a": 1}]]
+    assert spilled[-2] == records[-1] and spilled[1:3] == records[1:]
+    assert [spilled.column(index).kind for index in range(5)] == [
+        "json",
+        "json",
+        "json",
+        "int",
+        "json",
+    ]
+    spilled.close()
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_spilled_column_views(tmp_path):
+    np = pytest.importorskip("numpy")
+    store = SpillStore(str(tmp_path))
+    store.append([[1, 0.5], [None, None], [3, 2.5]])
+    spilled = store.open()
+    arrays = spilled.to_numpy()
+    for values in arrays.values():
+        assert isinstance(values, np.ma.MaskedArray)
+        assert not values.data.flags.owndata
+        assert list(values.mask) == [False, True, False]
+    assert arrays[1][2] == 2.5
+    del arrays, values
+    spilled.close()
+
+
+def test_select_spill(dataproduct, tmp_path):
+    expected = dataproduct.select()
+    results = dataproduct.select(spill=str(tmp_path), max_workers=2)
+    assert isinstance(results.records, SpilledRecords)
+    assert len(results.records) == 2500
+    assert results.records == expected.records
+    assert results.records[-1] == expected.records[-1]
+
+    arrays = results.to_columns()
+    assert not arrays["id"].flags.owndata
+    assert list(arrays["id"][:3]) == [0, 1, 2]
+    assert list(arrays["Sex"][:2]) == [record[2] for record in expected.records[:2]]
+
+    results.records.close()
+    assert os.listdir(str(tmp_path)) == []
+    with pytest.raises(ValueError):
+        dataproduct.select(spill=str(tmp_path), compact=True)
+
+
+# testing batched queries
+def test_run_many(mock):
+    server = Server(mock.url)
+    spec = {"catalog": "test", "dataproduct": "synthetic"}
+    queries = [
+        dict(spec, query="tabulate", params={"dims": ["sex"]}),
+        dict(spec, params={"cols": ["id"], "limit": 10}),
+        dict(spec, query="count"),
+        dict(spec, params={"limit": 10, "cols": ["id"]}),
+    ]
+    selects = mock.count_requests("/select?")
+    results = server.run_many(queries)
+
+    assert len(results) == 4
+    assert results[0].columns == ["Sex", "count"]
+    assert [record[0] for record in results[1].records] == list(range(10))
+    assert results[2] == mock.rows
+    # the same select written with its parameters in another order only runs once
+    assert results[3] is results[1]
+    assert mock.count_requests("/select?") - selects == 1
+
+
+def test_run_many_errors(mock):
+    server = Server(mock.url, transport=Transport(retry=RetryPolicy(total=0)))
+    queries = [
+        {"catalog": "test", "dataproduct": "missing", "query": "count"},
+        {"catalog": "test", "dataproduct": "synthetic", "query": "count"},
+    ]
+    with pytest.raises(RdsHTTPError):
+        server.run_many(queries)
+    results = server.run_many(queries, return_exceptions=True)
+    assert isinstance(results[0], RdsHTTPError)
+    assert results[1] == mock.rows
+    with pytest.raises(ValueError):
+        server.run_many([{"catalog": "test", "dataproduct": "synthetic", "query": "drop"}])
+
+
+# testing request instrumentation
+def test_stats_collector(mock):
+    collector = StatsCollector(history=10)
+    server = Server(
+        mock.url,
+        transport=Transport(retry=RetryPolicy(backoff_factor=0.01)),
+        observer=collector,
+    )
+    dataproduct = server.get_catalog("test").get_dataproduct("synthetic")
+    mock.fail("offset=1250", status=503)
+    results = dataproduct.select()
+    records = list(dataproduct.iter_select(limit=100))
+
+    totals = collector.snapshot()
+    assert len(results.records) == 2500 and len(records) == 100
+    # catalog, data product, three select pages of which one failed, and the streamed page
+    assert totals["requests"] == 6
+    assert totals["errors"] == 1
+    assert totals["retries"] == 1
+    assert totals["queries"] == 2
+    assert totals["pages"] == 3
+    assert totals["rows"] == 2600
+    assert totals["bytes"] > 0
+
+    request = collector.requests[-2]
+    assert request.status == 200
+    assert request.total_time >= request.first_byte_time > 0
+    assert request.parse_time is not None
+    assert request.to_dict()["retries"] == 1
+    query = collector.queries[0]
+    assert query.kind == "select"
+    assert query.rows_per_second > 0
+
+
+# testing the asyncio client
+def test_async_metadata(mock):
+    async def run():
+        server = AsyncServer(mock.url)
+        root_catalog = await server.get_root_catalog()
+        catalog = await server.get_catalog("test")
+        dataproduct = await catalog.get_dataproduct("synthetic")
+        variable = await dataproduct.get_variable("sex")
+        code = await dataproduct.get_code("sex")
+        count = await dataproduct.count()
+        await server.transport.close()
+        return root_catalog, catalog, dataproduct, variable, code, count
+
+    root_catalog, catalog, dataproduct, variable, code, count = asyncio.run(run())
+    assert root_catalog["catalogs"][0]["id"] == "test"
+    assert catalog.name == "Test"
+    assert dataproduct.last_update == "2020-07-01T00:00:00Z"
+    assert variable["id"] == "sex"
+    assert len(code) == 2
+    assert count == 2500
+
+
+def test_async_select(mock):
+    async def run():
+        server = AsyncServer(mock.url, transport=AsyncTransport(max_concurrency=4))
+        catalog = await server.get_catalog("test")
+        dataproduct = await catalog.get_dataproduct("synthetic")
+        return await asyncio.gather(
+            dataproduct.select(),
+            dataproduct.select(count=True, max_workers=4),
+            dataproduct.select(cols=["id"], limit=10, offset=5),
+            dataproduct.tabulate(dims=["sex"], totals=True),
+        )
+
+    serial, parallel, limited, tabulated = asyncio.run(run())
+    assert serial.records == parallel.records == mock.records
+    assert parallel.count == 2500
+    assert limited.records == [[i] for i in range(5, 15)]
+    assert tabulated.records == [["1", 1250], ["2", 1250]]
+    assert tabulated.totals == [[None, 2500]]
+
+
+def test_async_inject_client(mock, dataproduct):
+    async def run():
+        server = AsyncServer(mock.url)
+        catalog = await server.get_catalog("test")
+        async_dataproduct = await catalog.get_dataproduct("synthetic")
+        codes = await async_dataproduct.get_codes("region", page_size=1000)
+        return codes, await asyncio.gather(
+            async_dataproduct.select(cols=["sex"], limit=3, inject="client"),
+            async_dataproduct.tabulate(dims=["sex"], totals=True, inject="client"),
+        )
+
+    codes, (selected, tabulated) = asyncio.run(run())
+    assert len(codes) == 2345
+    assert selected.records == [["Male"], ["Female"], ["Male"]]
+    expected = dataproduct.tabulate(dims=["sex"], totals=True, inject="client")
+    assert tabulated.records == expected.records
+
+
+def test_async_transport_proxy(mock, monkeypatch):
+    # the mock answers absolute request targets, so it can stand in for the proxy
+    monkeypatch.setenv("http_proxy", mock.url.split("/rds")[0])
+    monkeypatch.delenv("no_proxy", raising=False)
+    monkeypatch.delenv("NO_PROXY", raising=False)
+
+    async def run():
+        server = AsyncServer("http://rds.invalid/rds")
+        catalog = await server.get_catalog("test")
+        await server.transport.close()
+        return catalog
+
+    assert asyncio.run(run()).name == "Test"
+    assert mock.count_requests("http://rds.invalid/rds/api/catalog/test") == 1
+
+
+def test_async_transport_timeout(mock):
+    transport = AsyncTransport(timeout=0.2, retry=RetryPolicy(total=0))
+
+    async def run():
+        await transport.open(mock.url + "/api/catalog")
+        writer = [connection for connection in transport._pools.values()][0][0][1]
+        mock.latency = 0.5
+        try:
+            with pytest.raises(RdsError):
+                await transport.open(mock.url + "/api/catalog")
+        finally:
+            mock.latency = 0.0
+        await asyncio.sleep(0)
+        return writer
+
+    # the connection abandoned by the timeout is closed rather than leaked
+    assert asyncio.run(run()).is_closing()
+
+
+def test_async_response_without_body():
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b"HTTP/1.1 204 No Content\r\nServer: mock\r\n\r\n")
+        return await asyncio.wait_for(_read_response(reader, "http://rds"), 1)
+
+    response = asyncio.run(run())
+    assert response.status == 204 and response.body == b""
+    assert response._keep_alive
+
+
+# testing lazy metadata
+def test_lazy_metadata(mock):
+    server = Server(mock.url)
+    metadata_requests = mock.count_requests("/api/catalog/test")
+    dataproduct = server.get_catalog("test", lazy=True).get_dataproduct("synthetic")
+    results = dataproduct.select(cols=["id"], limit=5)
+
+    assert results.records == [[0], [1], [2], [3], [4]]
+    assert mock.count_requests("/api/catalog/test") == metadata_requests
+
+    assert dataproduct.name == "Synthetic"
+    assert dataproduct.last_update == "2020-07-01T00:00:00Z"
+    assert mock.count_requests("/api/catalog/test") == metadata_requests + 1
+
+
+# testing page sizing without a column count probe
+def test_select_no_probe(mock, dataproduct):
+    selects = mock.count_requests("/select?")
+    variables = mock.count_requests("/variables")
+    results = dataproduct.select()
+
+    assert results.records == mock.records
+    assert mock.count_requests("/select?") - selects == 2
+    assert mock.count_requests("/variables") == variables
+
+
+def test_select_lazy_sizes_once(mock):
+    server = Server(mock.url)
+    dataproduct = server.get_catalog("test", lazy=True).get_dataproduct("synthetic")
+    variables = mock.count_requests("/variables")
+    dataproduct.select(limit=10)
+    dataproduct.select(limit=10)
+
+    assert mock.count_requests("/variables") - variables == 1
+
+
+def test_select_adapts_page_size():
+    with MockRdsServer(rows=5000, cols=8) as mock:
+        dataproduct = Server(mock.url).get_catalog("test").get_dataproduct("synthetic")
+        results = dataproduct.select(coloffset=6)
+
+        assert results.records == [record[6:] for record in mock.records]
+        # the first page holds 1250 two-column records, the second the remaining 3750
+        assert mock.count_requests("/select?") == 2
+
+
+# testing columnar results
+def test_select_as_columns(mock, dataproduct):
+    np = pytest.importorskip("numpy")
+    results = dataproduct.select(as_columns=True, count=True)
+
+    assert results.records is None
+    assert results.count == 2500
+    assert list(results.arrays) == results.columns
+    assert results.arrays["id"].dtype == np.int64
+    assert results.arrays["id"].tolist() == list(range(2500))
+    assert results.arrays["value"].dtype == np.float64
+    assert np.isnan(results.arrays["value"][0])
+    assert results.arrays["value"][1] == 0.25
+    assert results.arrays["Sex"].dtype == object
+
+
+def test_to_columns(mock, dataproduct):
+    pytest.importorskip("numpy")
+    results = dataproduct.select(cols=["id", "sex"], limit=4, inject=True)
+    arrays = results.to_columns()
+
+    assert arrays["id"].tolist() == [0, 1, 2, 3]
+    assert arrays["Sex"].tolist() == ["Male", "Female", "Male", "Female"]
+
+    arrays = dataproduct.select(cols=["id"], limit=2, metadata=False).to_columns()
+    assert arrays[0].dtype == object
+
+
+# testing dataframe builders
+def test_select_frame(mock, dataproduct):
+    pd = pytest.importorskip("pandas")
+    dataframe = dataproduct.select_frame(max_workers=2)
+
+    assert list(dataframe.columns) == ["id", "date_stamp", "Sex", "value", "c4", "c5", "c6", "c7"]
+    assert len(dataframe) == 2500
+    assert dataframe["id"].tolist() == list(range(2500))
+    assert isinstance(dataframe["Sex"].dtype, pd.CategoricalDtype)
+    assert pd.isna(dataframe["value"][0])
+
+
+def test_select_frame_empty(mock, dataproduct):
+    pytest.importorskip("pandas")
+    dataframe = dataproduct.select_frame(cols=["id", "value"], where=["id<0"])
+
+    assert list(dataframe.columns) == ["id", "value"]
+    assert len(dataframe) == 0
+    assert dataframe["id"].dtype == "int64" and dataframe["value"].dtype == "float64"
+
+
+def test_to_arrow(mock, dataproduct):
+    pa = pytest.importorskip("pyarrow")
+    table = dataproduct.select(cols=["id", "sex", "value"], limit=8, inject=True).to_arrow()
+
+    assert table.column_names == ["id", "Sex", "value"]
+    assert table.column("id").to_pylist() == list(range(8))
+    assert pa.types.is_dictionary(table.column("Sex").type)
+    assert table.column("value").to_pylist()[:2] == [None, 0.25]
+
+
+# testing the on-disk result cache
+def test_result_cache(tmp_path):
+    with MockRdsServer(rows=300) as mock:
+        cache = ResultCache(str(tmp_path), revalidate=0)
+        server = Server(mock.url, cache=cache)
+        dataproduct = server.get_catalog("test").get_dataproduct("synthetic")
+
+        first = dataproduct.select()
+        second = dataproduct.select()
+        tabulated = dataproduct.tabulate(dims=["sex"])
+
+        assert first.records == second.records == mock.records
+        assert mock.count_requests("/select?") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+        assert tabulated.records == [["1", 150], ["2", 150]]
+
+        mock.last_update = "2020-08-01T00:00:00Z"
+        dataproduct.select()
+        assert mock.count_requests("/select?") == 2
+        assert cache.misses == 3
+
+
+def test_result_cache_with_metadata_cache(tmp_path):
+    with MockRdsServer(rows=300) as mock:
+        server = Server(
+            mock.url,
+            cache=ResultCache(str(tmp_path), revalidate=0),
+            metadata_cache=MetadataCache(),
+        )
+        dataproduct = server.get_catalog("test").get_dataproduct("synthetic")
+        dataproduct.select()
+        dataproduct.select()
+        assert mock.count_requests("/select?") == 1
+
+        # revalidating looks past the cached metadata for the new last update
+        mock.last_update = "2020-08-01T00:00:00Z"
+        dataproduct.select()
+        assert mock.count_requests("/select?") == 2
+        assert dataproduct.last_update == "2020-08-01T00:00:00Z"
+
+
+def test_result_cache_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size=250)
+    for i in range(5):
+        cache.put("http://host/select?offset=%d" % i, "v1", {"records": [[i] * 20]})
+
+    assert cache.stats()["size"] <= 250
+    assert cache.evictions > 0
+    assert cache.get("http://host/select?offset=4", "v1") == {"records": [[4] * 20]}
+    assert cache.get("http://host/select?offset=0", "v1") is None
+
+
+# testing the in-memory metadata cache
+def test_metadata_cache(mock):
+    metadata_cache = MetadataCache(ttl=60, ttls={"code": 0}, max_entries=3)
+    server = Server(mock.url, metadata_cache=metadata_cache)
+    variable_requests = mock.count_requests("/variable/sex")
+    dataproduct = server.get_catalog("test").get_dataproduct("synthetic")
+    dataproduct = server.get_catalog("test").get_dataproduct("synthetic")
+
+    assert dataproduct.get_variable("sex") is dataproduct.get_variable("sex")
+    assert mock.count_requests("/variable/sex") - variable_requests == 1
+
+    # codes never stay fresh, and the catalog entry is the least recently used
+    code_requests = mock.count_requests("/codes")
+    dataproduct.get_code("sex")
+    dataproduct.get_code("sex")
+    assert mock.count_requests("/codes") - code_requests == 2
+    assert metadata_cache.stats()["entries"] == 3
+    assert metadata_cache.evictions == 1
+
+    metadata_cache.invalidate(endpoint="variable")
+    dataproduct.get_variable("sex")
+    assert mock.count_requests("/variable/sex") - variable_requests == 2
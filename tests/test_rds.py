@@ -5,7 +5,9 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(".."))
 
-from rds import Server
+import pytest
+
+from rds import RdsError, RdsHTTPError, Server
 
 server = Server("https://covid19.richdataservices.com/rds")
 
@@ -323,10 +325,12 @@ def test_tabulate_complex_3():
     
 # testing invalid usage
 def test_invalid_catalog():
-    server.get_catalog("wrong")
+    with pytest.raises(RdsError):
+        server.get_catalog("wrong")
     
 def test_invalid_dataproduct():
-    _get_dataproduct("us_oh", "wrong")
+    with pytest.raises(RdsError):
+        _get_dataproduct("us_oh", "wrong")
     
 def test_invalid_column_name_cols():
     dataproduct = _get_dataproduct("us_oh", "oh_doh_cases")
@@ -338,11 +342,13 @@ def test_invalid_column_name_cols():
     
 def test_invalid_column_name_dims():
     dataproduct = _get_dataproduct("us_oh", "oh_doh_cases")
-    dataproduct.tabulate(dims=["ate_stamp"])
+    with pytest.raises(RdsHTTPError):
+        dataproduct.tabulate(dims=["ate_stamp"])
     
 def test_invalid_column_name_measure():
     dataproduct = _get_dataproduct("us_oh", "oh_doh_cases")
-    dataproduct.tabulate(dims=["date_stamp"], measure=["sum:sum(ate_stamp)"])
+    with pytest.raises(RdsHTTPError):
+        dataproduct.tabulate(dims=["date_stamp"], measure=["sum:sum(ate_stamp)"])
     
 def _get_dataproduct(catalog_id, dataproduct_id):
     catalog = server.get_catalog(catalog_id)